@@ -164,13 +164,13 @@ def substituteAuxFiles(module_dir, class_name, module_name, subdir, opt_visibili
                     }
 
     # Put AUX files to their target
+    jobs = []
     for src in target_locations:
         file_name = os.path.join("ElementsKernel", "templates", src)
         tgt = target_locations[src]
-        Auxiliary.configure(file_name, module_dir, tgt,
-                            configuration=configuration,
-                            create_missing_dir=True)
+        jobs.append((file_name, os.path.join(module_dir, tgt), configuration))
         ProjectCommonRoutines.addItemToCreationList(os.path.join(module_dir, tgt))
+    Auxiliary.configureFiles(jobs, create_missing_dir=True)
 
 # # ###############################################################################
 
@@ -93,14 +93,14 @@ def createCmakeListFile(project_dir, module_name, module_dep_list, standalone=Fa
     """
     Create the <CMakeList.txt> file and add dependencies to it
     """
+    module_dir = os.path.join(project_dir, module_name)
+    jobs = []
     for src in target_locations:
         file_name = os.path.join("ElementsKernel", "templates", src)
         tgt = target_locations[src]
-        module_dir = os.path.join(project_dir, module_name)
-        Auxiliary.configure(file_name, module_dir, tgt,
-                            configuration="",
-                            create_missing_dir=True)
+        jobs.append((file_name, os.path.join(module_dir, tgt), None))
         ProjectCommonRoutines.addItemToCreationList(os.path.join(module_dir, tgt))
+    Auxiliary.configureFiles(jobs, create_missing_dir=True)
 
     # Read the template file
     cmake_list_file = os.path.join(module_dir, CMAKE_LISTS_FILE)
@@ -110,13 +110,13 @@ def createPythonModule(module_dir, module_name, python_module_name):
                        "PYTHONMODULE": python_module_name
                     }
     # Put AUX files to their target and substitut
+    jobs = []
     for src in target_locations:
         file_name = os.path.join("ElementsKernel", "templates", src)
         tgt = target_locations[src]
-        Auxiliary.configure(file_name, module_dir, tgt,
-                            configuration=configuration,
-                            create_missing_dir=True)
+        jobs.append((file_name, os.path.join(module_dir, tgt), configuration))
         ProjectCommonRoutines.addItemToCreationList(os.path.join(module_dir, tgt))
+    Auxiliary.configureFiles(jobs, create_missing_dir=True)
 
     updateCmakeListsFile(module_dir)
 
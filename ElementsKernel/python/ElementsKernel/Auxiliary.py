@@ -23,10 +23,29 @@
 
 '''
 
-import shutil
 import os
+import mmap
+import stat
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from ElementsKernel.Path import getLocations, getPath, getPaths, getTargetPath, openFile
+from ElementsKernel import Logging
+
+LOGGER = Logging.getLogger(__name__)
+
+DEFAULT_MAP_CACHE_SIZE = 32
 
-from ElementsKernel.Path import getLocations, getPath, getTargetPath
+_map_cache = OrderedDict()
+
+_map_cache_size = DEFAULT_MAP_CACHE_SIZE
+
+_TEMPLATE_CACHE_SIZE = 32
+
+_template_cache = OrderedDict()
+
+_COPY_CHUNK_SIZE = 1024 * 1024
 
 
 def getAuxiliaryLocations(exist_only=False):
@@ -43,9 +62,239 @@ def getAuxiliaryPath(file_name, raise_exception=True):
     return getPath(file_name, "auxiliary", raise_exception)
 
 
+def getAuxiliaryPaths(file_names, raise_exception=True):
+    """
+    Get full paths to the file names searched in the auxiliary path
+    """
+    return getPaths(file_names, "auxiliary", raise_exception)
+
+
+def setAuxiliaryCacheSize(size):
+    """ Set the maximal number of memory maps kept by openAuxiliary
+    :param size: the number of maps. 0 disables the cache.
+    """
+    global _map_cache_size
+    _map_cache_size = size
+    while len(_map_cache) > _map_cache_size:
+        _map_cache.popitem(last=False)
+
+
+def clearAuxiliaryCache():
+    """ Forget all the memory maps kept by openAuxiliary """
+    _map_cache.clear()
+
+
+def _mapFile(file_path):
+    """ Get a read-only memory map of the file. The members of an archive
+    location cannot be mapped and they are read in memory instead.
+    """
+    if not os.path.isfile(file_path):
+        with openFile(file_path, "rb") as f:
+            return f.read()
+    with open(file_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def openAuxiliary(file_name, mode="mmap", dtype=None, offset=0):
+    """ Get a read-only view of the content of an auxiliary file. The
+    memory maps are kept in a bounded LRU cache and shared between the
+    calls.
+    :param file_name: the auxiliary file name
+    :param mode: "mmap" for a read-only memory map, "numpy" for a NumPy
+    array viewing the data
+    :param dtype: the NumPy data type of the array for the "numpy" mode
+    :param offset: the offset in bytes of the array data for the "numpy" mode
+    :return: the memory map or the NumPy array
+    """
+    if mode not in ("mmap", "numpy"):
+        raise ValueError("Unknown \"%s\" mode to open an auxiliary file" % mode)
+
+    file_path = getAuxiliaryPath(file_name)
+
+    key = file_path
+    if os.path.isfile(file_path):
+        file_stat = os.stat(file_path)
+        key = (file_path, file_stat.st_mtime, file_stat.st_size)
+
+    data = _map_cache.pop(key, None)
+    if data is None:
+        data = _mapFile(file_path)
+    if _map_cache_size:
+        _map_cache[key] = data
+        while len(_map_cache) > _map_cache_size:
+            _map_cache.popitem(last=False)
+
+    if mode == "numpy":
+        import numpy
+        if dtype is None:
+            dtype = numpy.uint8
+        return numpy.frombuffer(data, dtype=dtype, offset=offset)
+
+    return data
+
+
+def _getTemplate(file_path):
+    """ Get the (cached) text of a template file. The cache entry of a file
+    is replaced when its modification time or its size change. The cache
+    keeps the last used templates only.
+    """
+    file_key = None
+    if os.path.isfile(file_path):
+        file_stat = os.stat(file_path)
+        file_key = (file_stat.st_mtime, file_stat.st_size)
+
+    cached = _template_cache.pop(file_path, None)
+    if cached is None or cached[0] != file_key:
+        with openFile(file_path) as f:
+            cached = (file_key, f.read())
+    _template_cache[file_path] = cached
+    while len(_template_cache) > _TEMPLATE_CACHE_SIZE:
+        _template_cache.popitem(last=False)
+    return cached[1]
+
+
+def clearTemplateCache():
+    """ Forget the templates kept by configure and configureFiles """
+    _template_cache.clear()
+
+
+def _getDefaultFileMode():
+    """ Get the permissions of a new file according to the umask """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _replaceFile(target_path, fill, file_mode=None):
+    """ Replace the target file atomically
+    :param fill: function writing the content to the temporary file path
+    :param file_mode: the permissions of the file. The ones of the existing
+    target are kept if None.
+    """
+    if file_mode is None and os.path.isfile(target_path):
+        file_mode = stat.S_IMODE(os.stat(target_path).st_mode)
+    if file_mode is None:
+        file_mode = _getDefaultFileMode()
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path) or ".",
+                                    prefix="." + os.path.basename(target_path))
+    os.close(fd)
+    try:
+        fill(tmp_path)
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _writeIfChanged(target_path, content):
+    """ Write the text to the target file only if it differs from the
+    current one. The file is replaced atomically.
+    :param content: the text to be written
+    :return: True if the file has been written
+    """
+    if os.path.isfile(target_path):
+        try:
+            with open(target_path) as f:
+                if f.read() == content:
+                    return False
+        except (IOError, UnicodeDecodeError):
+            pass
+
+    def fill(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write(content)
+
+    _replaceFile(target_path, fill)
+    return True
+
+
+def _isSameContent(file_path, target_path):
+    """ Compare the content of a file, which can be an archive member, with
+    the target file. The files are read by chunks.
+    """
+    if not os.path.isfile(target_path):
+        return False
+    if os.path.isfile(file_path) and os.path.getsize(file_path) != os.path.getsize(target_path):
+        return False
+    with openFile(file_path, "rb") as f, open(target_path, "rb") as target:
+        while True:
+            chunk = f.read(_COPY_CHUNK_SIZE)
+            if chunk != target.read(_COPY_CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def _copyIfChanged(file_path, target_path):
+    """ Copy a file, which can be an archive member, to the target file only
+    if their contents differ. The file is streamed and not kept in memory,
+    and the target is replaced atomically with the permissions of the file.
+    :return: True if the file has been copied
+    """
+    if _isSameContent(file_path, target_path):
+        return False
+
+    file_mode = None
+    if os.path.isfile(file_path):
+        file_mode = stat.S_IMODE(os.stat(file_path).st_mode)
+
+    def fill(tmp_path):
+        if os.path.isfile(file_path):
+            shutil.copyfile(file_path, tmp_path)
+        else:
+            with openFile(file_path, "rb") as f, open(tmp_path, "wb") as target:
+                shutil.copyfileobj(f, target, _COPY_CHUNK_SIZE)
+
+    _replaceFile(target_path, fill, file_mode)
+    return True
+
+
+def _configureFile(file_path, target_path, configuration, create_missing_dir):
+    """ Render a resolved template to its target
+    :return: True if the target has been written
+    """
+    if create_missing_dir:
+        parent_path = os.path.dirname(target_path)
+        if not os.path.exists(parent_path):
+            os.makedirs(parent_path)
+
+    if not configuration:
+        return _copyIfChanged(file_path, target_path)
+
+    return _writeIfChanged(target_path, _getTemplate(file_path) % configuration)
+
+
+def configureFiles(jobs, create_missing_dir=False):
+    """ Batch copy/configuration of files. The templates are resolved in one
+    pass and the substituted ones are cached, and the targets are only
+    (atomically) written if their content changes.
+    :param jobs: list of (file_name, target_path, configuration) tuples
+    where file_name is the auxiliary template name, target_path the full
+    path of the target and configuration the dictionary of items to replace
+    in the text (or None for a plain copy).
+    :param create_missing_dir: create intermediate directories if they don't exist
+    :return: the list of the target paths that have been written.
+    """
+    file_paths = getAuxiliaryPaths([j[0] for j in jobs])
+
+    written = []
+    for file_path, (_, target_path, configuration) in zip(file_paths, jobs):
+        if _configureFile(file_path, target_path, configuration, create_missing_dir):
+            written.append(target_path)
+        else:
+            LOGGER.debug("The %s file is up to date", target_path)
+
+    return written
+
+
 def configure(file_name, target_dir, target_name=None, use_stem=False,
               configuration=None, create_missing_dir=False):
-    """ Copy/configuration of a file
+    """ Copy/configuration of a file. The target is only written if its
+    content changes.
     :param file_name: the original file name with or without a stem
     :param target_dir: the target directory
     :param target_name: the target name if any
@@ -58,17 +307,6 @@ def configure(file_name, target_dir, target_name=None, use_stem=False,
     file_path = getAuxiliaryPath(file_name)
     target_path = getTargetPath(file_name, target_dir, target_name, use_stem)
 
-    if create_missing_dir:
-        parent_path = os.path.dirname(target_path)
-        if not os.path.exists(parent_path):
-            os.makedirs(parent_path)
-
-    if not configuration:
-        shutil.copy(file_path, target_path)
-    else:
-        file_txt = open(file_path).read()
-        with open(target_path, "w") as tf:
-            tf.write(file_txt % configuration)
+    _configureFile(file_path, target_path, configuration, create_missing_dir)
 
     return target_path
-
@@ -0,0 +1,188 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+Checkpoints of the long-running programs.
+
+A checkpoint holds a work cursor (e.g. the number of processed items) and
+a picklable state. The program checkpoint is configured by the
+--checkpoint-dir and --resume generic options and is available to the main
+method with getCheckpoint:
+
+    checkpoint = Checkpoint.getCheckpoint()
+    total = checkpoint.getState(0)
+    for idx, item in checkpoint.iterate(items):
+        total += process(item)
+        checkpoint.save(idx + 1, total)
+'''
+
+import os
+import time
+import pickle
+import tempfile
+
+from ElementsKernel import Logging
+
+LOGGER = Logging.getLogger(__name__)
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class Checkpoint(object):
+    """ Checkpoint file of a program """
+
+    def __init__(self, file_name, resume=False, key=None, interval=0.0):
+        """
+        :param file_name: path to the checkpoint file
+        :param resume: load the existing checkpoint. If False, the work
+            starts from zero and the existing checkpoint is overwritten.
+        :param key: identification of the work (e.g. the program options).
+            A checkpoint written with another key is not resumed.
+        :param interval: minimum number of seconds between two writes
+        """
+        self._file_name = file_name
+        self._key = key
+        self._interval = interval
+        self._last_save = None
+        self._cursor = None
+        self._state = None
+        self._resumed = False
+        if resume:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self._file_name, "rb") as f:
+                content = pickle.load(f)
+        except (IOError, OSError):
+            LOGGER.info("No checkpoint to resume from in %s", self._file_name)
+            return
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError, TypeError) as e:
+            # e.g. truncated file, or class of the state changed since the checkpoint
+            LOGGER.warning("The checkpoint %s cannot be read (%s): it is ignored", self._file_name, e)
+            return
+        if not isinstance(content, dict) or content.get("key") != self._key:
+            LOGGER.warning("The checkpoint %s has been written for another work: it is ignored",
+                           self._file_name)
+            return
+        self._cursor = content["cursor"]
+        self._state = content["state"]
+        self._resumed = True
+        LOGGER.info("Resuming from the checkpoint %s at %s", self._file_name, self._cursor)
+
+    def getFileName(self):
+        """ Get the path to the checkpoint file """
+        return self._file_name
+
+    def isResumed(self):
+        """ Check if the work restarts from a checkpoint """
+        return self._resumed
+
+    def getCursor(self, default=None):
+        """ Get the work cursor of the checkpoint """
+        if self._cursor is None:
+            return default
+        return self._cursor
+
+    def getState(self, default=None):
+        """ Get the state of the checkpoint """
+        if self._cursor is None:
+            return default
+        return self._state
+
+    def iterate(self, items):
+        """ Iterate over the (index, item) pairs of the items which have not
+        been processed yet, the cursor being the number of processed items
+        :param items: iterable of the work items, in the same order for all
+            the runs
+        """
+        start = self.getCursor(0)
+        for idx, item in enumerate(items):
+            if idx >= start:
+                yield idx, item
+
+    def save(self, cursor, state=None, force=False):
+        """ Write the checkpoint atomically: the file is either the previous
+        or the new checkpoint, even if the program is killed
+        :param cursor: work cursor (e.g. the number of processed items)
+        :param state: picklable state of the work
+        :param force: write even if the interval since the last write has
+            not elapsed
+        :return: True if the checkpoint has been written
+        """
+        self._cursor = cursor
+        self._state = state
+        now = time.time()
+        if not force and self._last_save is not None and now - self._last_save < self._interval:
+            return False
+        directory = os.path.dirname(os.path.abspath(self._file_name))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"key": self._key, "cursor": cursor, "state": state}, f,
+                            pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._file_name)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._last_save = now
+        return True
+
+    def flush(self):
+        """ Write the last saved cursor and state if they have been skipped
+        because of the interval """
+        if self._cursor is not None:
+            self.save(self._cursor, self._state, force=True)
+
+    def clear(self):
+        """ Remove the checkpoint file """
+        self._cursor = None
+        self._state = None
+        if os.path.exists(self._file_name):
+            os.remove(self._file_name)
+
+
+_checkpoint = None
+
+
+def configure(directory, name, resume=False, key=None, interval=0.0):
+    """ Set the checkpoint of the program
+    :param directory: checkpoint directory. None to disable the checkpoint.
+    :param name: name of the checkpoint (e.g. the program name)
+    :return: the checkpoint of the program
+    """
+    global _checkpoint
+    _checkpoint = None
+    if directory:
+        _checkpoint = Checkpoint(os.path.join(directory, name + CHECKPOINT_SUFFIX),
+                                 resume, key, interval)
+    return _checkpoint
+
+
+def getCheckpoint():
+    """ Get the checkpoint of the program. None if no checkpoint directory
+    has been given.
+    """
+    return _checkpoint
@@ -0,0 +1,127 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+Concurrency settings shared by the Elements programs: the limit of the
+threads of the native libraries (OpenMP, BLAS, ...) and a shared
+concurrent.futures executor for the main method.
+'''
+
+import os
+
+# Environment variables read by the native libraries when they are loaded
+THREAD_LIMIT_VARS = ["OMP_NUM_THREADS",
+                     "OPENBLAS_NUM_THREADS",
+                     "MKL_NUM_THREADS",
+                     "VECLIB_MAXIMUM_THREADS",
+                     "NUMEXPR_NUM_THREADS",
+                     "BLIS_NUM_THREADS"]
+
+_num_threads = None
+_num_processes = None
+_executor = None
+_saved_thread_limits = None
+
+
+def setThreadLimit(num_threads):
+    """ Set the number of threads of the native libraries. It only applies
+    to the libraries loaded afterwards.
+    :param num_threads: maximum number of threads
+    """
+    global _saved_thread_limits
+    if _saved_thread_limits is None:
+        _saved_thread_limits = dict([(var, os.environ.get(var, None)) for var in THREAD_LIMIT_VARS])
+    for var in THREAD_LIMIT_VARS:
+        os.environ[var] = str(num_threads)
+
+
+def resetThreadLimit():
+    """ Restore the thread limit variables set before the first call to
+    setThreadLimit """
+    global _saved_thread_limits
+    if _saved_thread_limits is None:
+        return
+    for var, value in _saved_thread_limits.items():
+        if value is None:
+            os.environ.pop(var, None)
+        else:
+            os.environ[var] = value
+    _saved_thread_limits = None
+
+
+def configure(num_threads=None, num_processes=None):
+    """ Configure the concurrency of the program. The thread limit of the
+    native libraries is the number of threads if given. Otherwise, with a
+    number of processes, the CPUs are shared between the processes.
+    :param num_threads: number of threads
+    :param num_processes: number of processes of the shared executor
+    :return: the thread limit of the native libraries (None if not set).
+        Without limit, a limit set by a previous call is removed.
+    """
+    global _num_threads, _num_processes
+    if (num_threads, num_processes) != (_num_threads, _num_processes):
+        shutdownExecutor()
+    _num_threads = num_threads
+    _num_processes = num_processes
+    thread_limit = None
+    if num_threads:
+        thread_limit = num_threads
+    elif num_processes:
+        thread_limit = max(1, (os.cpu_count() or 1) // num_processes)
+    if thread_limit:
+        setThreadLimit(thread_limit)
+    else:
+        resetThreadLimit()
+    return thread_limit
+
+
+def getNumThreads():
+    """ Get the configured number of threads. None if not configured """
+    return _num_threads
+
+
+def getNumProcesses():
+    """ Get the configured number of processes. None if not configured """
+    return _num_processes
+
+
+def getExecutor():
+    """ Get the executor shared by the program. It is created on the first
+    call: a process pool if a number of processes is configured, a thread
+    pool otherwise (with the configured number of threads, or the default
+    of concurrent.futures).
+    """
+    global _executor
+    if _executor is None:
+        if _num_processes:
+            from concurrent.futures import ProcessPoolExecutor
+            _executor = ProcessPoolExecutor(_num_processes)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(_num_threads)
+    return _executor
+
+
+def shutdownExecutor(wait=True):
+    """ Shut the shared executor down, if it has been created """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait)
+        _executor = None
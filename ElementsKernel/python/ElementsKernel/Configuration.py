@@ -23,7 +23,7 @@
 
 '''
 
-from ElementsKernel.Path import getLocations, getPath
+from ElementsKernel.Path import getLocations, getPath, getPaths
 
 
 def getConfigurationLocations(exist_only=False):
@@ -39,3 +39,10 @@ def getConfigurationPath(file_name, raise_exception=True):
     """
     return getPath(file_name, "configuration", raise_exception)
 
+
+def getConfigurationPaths(file_names, raise_exception=True):
+    """
+    Get full paths to the file names searched in the Configuration path
+    """
+    return getPaths(file_names, "configuration", raise_exception)
+
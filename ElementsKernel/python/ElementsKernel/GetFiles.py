@@ -109,9 +109,7 @@ def mainMethod(args):
         logger.info("No stem provided. Listing all files")
         found_list = []
         for l in locations:
-            for root, _, files in os.walk(l):
-                for f in files:
-                    found_list.append(os.path.join(root, f))
+            found_list += Path.getAllFilesFromLocation(l)
 
     found_list = selfFilter(found_list, args.self)
 
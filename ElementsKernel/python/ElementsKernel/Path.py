@@ -25,12 +25,19 @@
 
 import os
 import sys
+import atexit
 import sysconfig
 import re
+import io
+import time
 from collections import OrderedDict
+from functools import wraps
 
+from ElementsKernel import Logging
 from ElementsKernel.System import SHLIB_VAR_NAME, DEFAULT_INSTALL_PREFIX
 
+LOGGER = Logging.getLogger(__name__)
+
 Type = ["executable", "library", "python", "configuration", "auxiliary"]
 
 PATHSEP = os.pathsep
@@ -66,23 +73,808 @@ HAS_SUBLEVELS = {
      "auxiliary": True
      }
 
+STATS_VAR = "ELEMENTS_PATH_STATS"
+
+_stats = None
+
+
+def enableStats():
+    """ Switch on the counters and timers of the file lookups """
+    global _stats
+    _stats = {"stat_calls": 0,
+              "index_lookups": 0,
+              "manifest_lookups": 0,
+              "location_hits": {}}
+
+
+def disableStats():
+    """ Switch off the counters and timers of the file lookups """
+    global _stats
+    _stats = None
+
+
+def resetStats():
+    """ Reset the counters and timers of the file lookups if enabled """
+    if _stats is not None:
+        enableStats()
+
+
+def getStats():
+    """ Get the counters and timers of the file lookups. For each of the
+    instrumented functions, the number of calls and the cumulative time in
+    seconds are given. The number of the stat-like system calls, of the
+    lookups answered by the location index or by a manifest and the hits
+    per location are given as well.
+    :return: a copy of the statistics dictionary. None if not enabled
+    """
+    if _stats is None:
+        return None
+    stats = dict(_stats)
+    stats["location_hits"] = dict(_stats["location_hits"])
+    return stats
+
+
+def _countStats(name, count=1):
+    """ Increment a counter of the statistics if enabled """
+    if _stats is not None:
+        _stats[name] += count
+
+
+def _countHit(location):
+    """ Increment the hits of a location if the statistics are enabled """
+    if _stats is not None:
+        hits = _stats["location_hits"]
+        hits[location] = hits.get(location, 0) + 1
+
+
+def _timed(function):
+    """ Decorator counting the calls and the cumulative time of a function
+    if the statistics are enabled
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if _stats is None:
+            return function(*args, **kwargs)
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if _stats is not None:
+                entry = _stats.setdefault(function.__name__, {"calls": 0, "seconds": 0.0})
+                entry["calls"] += 1
+                entry["seconds"] += time.time() - start
+    return wrapper
+
+
+def _getPositiveFloatEnv(var_name):
+    """ Get the positive number set in an environment variable. A warning is
+    issued for a malformed value, which is ignored.
+    :param var_name: name of the environment variable
+    :return: the number. None if the variable is not set or malformed.
+    """
+    value = os.environ.get(var_name, None)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0.0
+    if not number > 0.0:
+        LOGGER.warning("The %s environment variable is not a positive number: %r. It is ignored",
+                       var_name, value)
+        return None
+    return number
+
+
+if STATS_VAR in os.environ:
+    enableStats()
+
+
+USE_INDEX_VAR = "ELEMENTS_USE_PATH_INDEX"
+
+DEFAULT_INDEX_CHECK_INTERVAL = 5.0
+
+
+class LocationIndex(object):
+    """ In-memory index of the directory listings of the search locations.
+
+    Each directory is listed once with os.scandir and the listing is kept
+    together with the modification time of the directory. The modification
+    times are checked again at most every check_interval seconds and the
+    outdated listings are dropped.
+    """
+
+    def __init__(self, check_interval=DEFAULT_INDEX_CHECK_INTERVAL):
+        self._check_interval = check_interval
+        self._listings = {}
+        self._last_check = time.time()
+
+    def _listing(self, dir_path):
+        """ Get the (cached) set of entry names of a directory. None
+        if the directory cannot be listed.
+        """
+        if dir_path not in self._listings:
+            _countStats("stat_calls", 2)
+            try:
+                mtime = os.stat(dir_path).st_mtime
+                with os.scandir(dir_path) as it:
+                    names = frozenset(e.name for e in it if e.is_dir() or e.is_file())
+            except OSError:
+                mtime, names = None, None
+            self._listings[dir_path] = (mtime, names)
+        return self._listings[dir_path][1]
+
+    def validate(self):
+        """ Drop the listings of the directories that have changed """
+        _countStats("stat_calls", len(self._listings))
+        for dir_path, (mtime, _) in list(self._listings.items()):
+            try:
+                current_mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                current_mtime = None
+            if current_mtime != mtime:
+                del self._listings[dir_path]
+        self._last_check = time.time()
+
+    def clear(self):
+        """ Drop all the listings """
+        self._listings.clear()
+        self._last_check = time.time()
+
+    def exists(self, location, file_name):
+        """ Index based equivalent of os.path.exists(os.path.join(location, file_name))
+        :param location: the search location
+        :param file_name: file name relative to the location. It can contain
+        sub directories.
+        """
+        if time.time() - self._last_check > self._check_interval:
+            self.validate()
+
+        parts = os.path.normpath(file_name).split(os.sep)
+        if os.path.isabs(file_name) or "." in parts or ".." in parts:
+            _countStats("stat_calls")
+            return os.path.exists(os.path.join(location, file_name))
+
+        dir_path = location
+        for p in parts:
+            names = self._listing(dir_path)
+            if not names or p not in names:
+                return False
+            dir_path = os.path.join(dir_path, p)
+
+        return True
+
+
+_location_index = None
+
+
+def enableLocationIndex(check_interval=DEFAULT_INDEX_CHECK_INTERVAL):
+    """ Switch on the in-memory location index for the file lookups
+    :param check_interval: minimal time in seconds between two checks of
+    the directory modification times.
+    """
+    global _location_index
+    _location_index = LocationIndex(check_interval)
+
+
+def disableLocationIndex():
+    """ Switch off the in-memory location index """
+    global _location_index
+    _location_index = None
+
+
+def getLocationIndex():
+    """ Get the current location index. None if it is not enabled """
+    return _location_index
+
+
+if USE_INDEX_VAR in os.environ:
+    enableLocationIndex()
+
+
+MANIFEST_FILE_NAME = "ELEMENTS_MANIFEST"
+
+IGNORE_MANIFEST_VAR = "ELEMENTS_IGNORE_MANIFEST"
 
+
+class InstallManifest(object):
+    """ Read-only access to the installation manifest of a project.
+
+    The manifest is generated at install time in the installation prefix of
+    the project. It contains the sorted list of the installed files, one path
+    relative to the prefix per line. The file is memory-mapped and searched
+    with a binary search.
+    """
+
+    def __init__(self, file_path):
+        import mmap
+        self._file_path = file_path
+        self._map = b""
+        with open(file_path, "rb") as f:
+            file_stat = os.fstat(f.fileno())
+            self._mtime = file_stat.st_mtime
+            if file_stat.st_size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def path(self):
+        """ Returns the path to the manifest file """
+        return self._file_path
+
+    def isOlderThan(self, path):
+        """ Check if the manifest is older than the last modification of
+        a path, e.g. a file added or removed after the installation
+        """
+        try:
+            return os.stat(path).st_mtime > self._mtime
+        except OSError:
+            return True
+
+    def _lineAt(self, start):
+        """ Get the line starting at the start offset and the offset
+        of its end
+        """
+        end = self._map.find(b"\n", start)
+        if end == -1:
+            end = len(self._map)
+        return self._map[start:end], end
+
+    def _lowerBound(self, key):
+        """ Get the offset of the first line that is not lower than the key """
+        lo, hi = 0, len(self._map)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._map.rfind(b"\n", lo, mid)
+            start = lo if start == -1 else start + 1
+            line, end = self._lineAt(start)
+            if line < key:
+                lo = min(end + 1, len(self._map))
+            else:
+                hi = start
+        return lo
+
+    def contains(self, rel_path):
+        """ Check if the relative path is an installed file or
+        a directory containing installed files
+        """
+        key = rel_path.encode("utf-8")
+        line, _ = self._lineAt(self._lowerBound(key))
+        if line == key:
+            return True
+        key += b"/"
+        line, _ = self._lineAt(self._lowerBound(key))
+        return line.startswith(key)
+
+    def getFiles(self, rel_dir):
+        """ Get all the installed files below the relative directory. The
+        returned paths are relative to the installation prefix.
+        """
+        key = rel_dir.encode("utf-8") + b"/"
+        file_list = []
+        start = self._lowerBound(key)
+        while start < len(self._map):
+            line, end = self._lineAt(start)
+            if not line.startswith(key):
+                break
+            file_list.append(line.decode("utf-8"))
+            start = end + 1
+        return file_list
+
+
+_manifest_files = {}
+
+_manifests = {}
+
+
+def _getManifestFile(prefix):
+    """ Get the (cached) manifest found in the prefix directory """
+    if prefix not in _manifest_files:
+        manifest = None
+        manifest_path = os.path.join(prefix, MANIFEST_FILE_NAME)
+        _countStats("stat_calls")
+        if os.path.isfile(manifest_path):
+            try:
+                manifest = InstallManifest(manifest_path)
+            except (IOError, OSError, ValueError):
+                manifest = None
+        _manifest_files[prefix] = manifest
+    return _manifest_files[prefix]
+
+
+def getManifest(location):
+    """ Get the installation manifest covering a search location. The
+    manifest is looked for in the parent directory of the location and
+    it has to list some files below the location. A manifest older than
+    the location is stale and it is not used.
+    :param location: the search location
+    :return: the InstallManifest instance or None
+    """
+    if IGNORE_MANIFEST_VAR in os.environ:
+        return None
+
+    if location not in _manifests:
+        norm_location = os.path.normpath(location)
+        manifest = _getManifestFile(os.path.dirname(norm_location))
+        if manifest and not manifest.contains(os.path.basename(norm_location)):
+            manifest = None
+        if manifest:
+            _countStats("stat_calls")
+            if manifest.isOlderThan(norm_location):
+                LOGGER.debug("The %s manifest is older than the %s location: it is not used",
+                             manifest.path(), location)
+                manifest = None
+        _manifests[location] = manifest
+
+    return _manifests[location]
+
+
+def _getManifestKey(location, file_name):
+    """ Get the relative path to be searched in the manifest. None if the
+    file name cannot be expressed relatively to the location.
+    """
+    parts = os.path.normpath(file_name).split(os.sep)
+    if os.path.isabs(file_name) or "." in parts or ".." in parts:
+        return None
+    return "/".join([os.path.basename(os.path.normpath(location))] + parts)
+
+
+PROBE_TIMEOUT_VAR = "ELEMENTS_LOCATION_PROBE_TIMEOUT"
+
+DEFAULT_PROBE_TIMEOUT = 2.0
+
+DEFAULT_PROBE_WORKERS = 4
+
+
+class LocationProber(object):
+    """ Concurrent and time-bounded existence checks of the search locations.
+
+    The locations are checked by a small pool of daemon threads. A location
+    that doesn't answer within the timeout is marked as unavailable for the
+    rest of the process and it is not checked nor searched anymore.
+    """
+
+    def __init__(self, timeout=DEFAULT_PROBE_TIMEOUT, max_workers=DEFAULT_PROBE_WORKERS):
+        self._timeout = timeout
+        self._max_workers = max_workers
+        self._unavailable = set()
+
+    def isAvailable(self, location):
+        """ Check if the location has not been marked as unavailable """
+        return location not in self._unavailable
+
+    def getUnavailableLocations(self):
+        """ Get the list of the locations marked as unavailable """
+        return sorted(self._unavailable)
+
+    def filterExisting(self, locations):
+        """ Get the existing locations, in the same order
+        :param locations: list of locations to be checked
+        """
+        pending = [l for l in removeDuplicates(locations) if l not in self._unavailable]
+        _countStats("stat_calls", len(pending))
+        queue = list(reversed(pending))
+        started = {}
+        results = {}
+        # only imported by the programs which enable the probing
+        import threading
+        condition = threading.Condition()
+
+        def probe():
+            """ worker function checking the queued locations """
+            while True:
+                with condition:
+                    if not queue:
+                        return
+                    location = queue.pop()
+                    started[location] = time.time()
+                exists = os.path.exists(location)
+                with condition:
+                    results[location] = exists
+                    duration = time.time() - started[location]
+                    condition.notify_all()
+                LOGGER.debug("Probe of the %s location: %.3f s", location, duration)
+
+        def startWorker():
+            """ start a new daemon thread """
+            worker = threading.Thread(target=probe, name="ElementsLocationProbe")
+            worker.daemon = True
+            worker.start()
+
+        for _ in range(min(self._max_workers, len(pending))):
+            startWorker()
+
+        with condition:
+            while [l for l in pending if l not in results and l not in self._unavailable]:
+                now = time.time()
+                deadlines = []
+                for l, start in started.items():
+                    if l in results or l in self._unavailable:
+                        continue
+                    if now - start > self._timeout:
+                        LOGGER.warning("The %s location didn't answer within %s s: it is marked as unavailable",
+                                       l, self._timeout)
+                        self._unavailable.add(l)
+                        # the hanging worker is replaced
+                        if queue:
+                            startWorker()
+                    else:
+                        deadlines.append(start + self._timeout)
+                wait_time = min(deadlines) - now if deadlines else self._timeout
+                condition.wait(max(wait_time, 0.001))
+
+        return [l for l in locations if results.get(l, False)]
+
+
+_location_prober = None
+
+
+def enableLocationProbing(timeout=DEFAULT_PROBE_TIMEOUT, max_workers=DEFAULT_PROBE_WORKERS):
+    """ Switch on the concurrent and time-bounded existence checks of
+    the locations
+    :param timeout: time in seconds after which a location is considered
+    as unavailable
+    :param max_workers: number of concurrent checks
+    """
+    global _location_prober
+    _location_prober = LocationProber(timeout, max_workers)
+
+
+def disableLocationProbing():
+    """ Switch off the concurrent existence checks of the locations """
+    global _location_prober
+    _location_prober = None
+
+
+def getLocationProber():
+    """ Get the current location prober. None if it is not enabled """
+    return _location_prober
+
+
+if _getPositiveFloatEnv(PROBE_TIMEOUT_VAR):
+    enableLocationProbing(_getPositiveFloatEnv(PROBE_TIMEOUT_VAR))
+
+
+def _filterExistingLocations(locations):
+    """ Get the existing locations, probed concurrently if enabled """
+    if _location_prober:
+        return _location_prober.filterExisting(locations)
+    _countStats("stat_calls", len(locations))
+    return [p for p in locations if os.path.exists(p)]
+
+
+ARCHIVE_SUFFIXES = (".zip",)
+
+
+class ArchiveLocation(object):
+    """ Search location provided by a zip archive.
+
+    The central directory of the archive is read only once and the members
+    are read without being extracted. The path of a member is the path of
+    the archive joined with the name of the member.
+    """
+
+    def __init__(self, file_path):
+        import zipfile
+        self._file_path = file_path
+        self._zip = zipfile.ZipFile(file_path)
+        self._files = set()
+        self._dirs = set()
+        for name in self._zip.namelist():
+            parts = name.rstrip("/").split("/")
+            if name.endswith("/"):
+                self._dirs.add(name.rstrip("/"))
+            else:
+                self._files.add(name)
+            for i in range(1, len(parts)):
+                self._dirs.add("/".join(parts[:i]))
+
+    def path(self):
+        """ Returns the path to the archive file """
+        return self._file_path
+
+    def contains(self, member):
+        """ Check if the member is a file or a directory of the archive """
+        member = "/".join(os.path.normpath(member).split(os.sep))
+        return member in self._files or member in self._dirs
+
+    def getFiles(self):
+        """ Get the names of all the file members """
+        return sorted(self._files)
+
+    def open(self, member, mode="r"):
+        """ Open a file member for reading
+        :param member: the name of the member
+        :param mode: "r" for text or "rb" for binary reading
+        """
+        member = "/".join(os.path.normpath(member).split(os.sep))
+        f = self._zip.open(member)
+        if "b" not in mode:
+            f = io.TextIOWrapper(f)
+        return f
+
+
+_archives = {}
+
+
+def getArchive(location):
+    """ Get the archive providing a search location
+    :param location: the search location
+    :return: the ArchiveLocation instance or None if the location is not
+    an archive
+    """
+    if location not in _archives:
+        archive = None
+        if location.endswith(ARCHIVE_SUFFIXES) and os.path.isfile(location):
+            import zipfile
+            try:
+                archive = ArchiveLocation(location)
+            except (IOError, OSError, zipfile.BadZipfile):
+                archive = None
+        _archives[location] = archive
+    return _archives[location]
+
+
+def _splitArchivePath(file_path):
+    """ Split a path to an archive member into the archive and the member
+    name. (None, None) is returned if the path is not inside an archive.
+    """
+    for suffix in ARCHIVE_SUFFIXES:
+        idx = file_path.find(suffix + os.sep)
+        if idx != -1:
+            archive = getArchive(file_path[:idx + len(suffix)])
+            if archive:
+                return archive, file_path[idx + len(suffix) + 1:]
+    return None, None
+
+
+def openFile(file_path, mode="r"):
+    """ Open a file for reading. The file can be a member of an archive
+    used as a search location.
+    :param file_path: the path to the file
+    :param mode: "r" for text or "rb" for binary reading
+    :return: the file object
+    """
+    archive, member = _splitArchivePath(file_path)
+    if archive:
+        return archive.open(member, mode)
+    return open(file_path, mode)
+
+
+def _existsInLocation(location, file_name, index=None):
+    """ Check if the file name exists in the location
+    :param index: the location index to be used instead of the global one
+    """
+    if _location_prober and not _location_prober.isAvailable(location):
+        return False
+    archive = getArchive(location)
+    if archive:
+        return archive.contains(file_name)
+    manifest = getManifest(location)
+    if manifest:
+        key = _getManifestKey(location, file_name)
+        if key:
+            _countStats("manifest_lookups")
+            return manifest.contains(key)
+    if not index:
+        index = _location_index
+    if index:
+        _countStats("index_lookups")
+        return index.exists(location, file_name)
+    _countStats("stat_calls")
+    return os.path.exists(os.path.join(location, file_name))
+
+
+def getAllFilesFromLocation(location):
+    """ Get all the files found below a location. The installation
+    manifest is used if the location carries one.
+    :param location: the search location
+    :return: the list of the full paths of the files
+    """
+    archive = getArchive(location)
+    if archive:
+        return [os.path.join(location, *f.split("/")) for f in archive.getFiles()]
+
+    manifest = getManifest(location)
+    if manifest:
+        prefix = os.path.dirname(os.path.normpath(location))
+        rel_dir = os.path.basename(os.path.normpath(location))
+        return [os.path.join(prefix, *f.split("/")) for f in manifest.getFiles(rel_dir)]
+
+    found_list = []
+    for root, _, files in os.walk(location):
+        for f in files:
+            found_list.append(os.path.join(root, f))
+    return found_list
+
+
+NEGATIVE_CACHE_TTL_VAR = "ELEMENTS_NEGATIVE_CACHE_TTL"
+
+NEGATIVE_CACHE_FILE_VAR = "ELEMENTS_NEGATIVE_CACHE_FILE"
+
+DEFAULT_NEGATIVE_CACHE_TTL = 300.0
+
+
+def getUserCacheDir():
+    """ Get the per-user cache directory of Elements """
+    cache_base = os.environ.get("XDG_CACHE_HOME", None)
+    if not cache_base:
+        cache_base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_base, "Elements")
+
+
+class NegativeCache(object):
+    """ Cache of the failed lookups.
+
+    The entries are keyed by the file type, the file name and the list of
+    locations that have been searched, and they expire after ttl seconds.
+    If a file path is given, the entries are also stored on disk to be
+    shared between processes. The new entries are written at exit, merged
+    with the entries written in the meantime by the other processes.
+    """
+
+    def __init__(self, ttl=DEFAULT_NEGATIVE_CACHE_TTL, file_path=None):
+        self._ttl = ttl
+        self._file_path = file_path
+        self._entries = {}
+        self._save_registered = False
+        if self._file_path:
+            self._entries = self._load()
+
+    @staticmethod
+    def _key(file_type, file_name, locations):
+        """ Build the key of an entry """
+        import json
+        return json.dumps([file_type, file_name, list(locations)])
+
+    def path(self):
+        """ Returns the path to the cache file. None if not persistent """
+        return self._file_path
+
+    def _load(self):
+        """ Get the unexpired entries from the cache file """
+        import json
+        now = time.time()
+        try:
+            with open(self._file_path) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return dict([(k, v) for k, v in entries.items() if v > now])
+
+    def _merge(self):
+        """ Merge the entries with the unexpired entries of the cache file.
+        The latest expiry time of an entry is kept.
+        """
+        entries = self._load()
+        now = time.time()
+        for key, expiry in self._entries.items():
+            if expiry > max(entries.get(key, 0.0), now):
+                entries[key] = expiry
+        self._entries = entries
+
+    def _write(self):
+        """ Write the entries into the cache file. The file is replaced
+        atomically, and removed if there is no entry.
+        """
+        import json
+        import tempfile
+        if self._save_registered:
+            # the file is up to date
+            atexit.unregister(self.save)
+            self._save_registered = False
+        cache_dir = os.path.dirname(self._file_path)
+        try:
+            if not self._entries:
+                if os.path.exists(self._file_path):
+                    os.remove(self._file_path)
+                return
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".negative_cache")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self._file_path)
+        except (IOError, OSError):
+            LOGGER.debug("Cannot write the %s negative lookup cache file", self._file_path)
+
+    def save(self):
+        """ Merge the entries into the cache file """
+        if not self._file_path:
+            return
+        self._merge()
+        self._write()
+
+    def isMissing(self, file_type, file_name, locations):
+        """ Check if the lookup is known to fail """
+        expiry = self._entries.get(self._key(file_type, file_name, locations), None)
+        return expiry is not None and expiry > time.time()
+
+    def addMissing(self, file_type, file_name, locations):
+        """ Record a failed lookup. If the cache is persistent, it is
+        written at exit.
+        """
+        self._entries[self._key(file_type, file_name, locations)] = time.time() + self._ttl
+        if self._file_path and not self._save_registered:
+            atexit.register(self.save)
+            self._save_registered = True
+
+    def invalidate(self, file_type=None):
+        """ Drop the entries
+        :param file_type: only drop the entries of this type of file. All
+        the entries are dropped if None.
+        """
+        if file_type:
+            import json
+            if self._file_path:
+                # keep the entries of the other types written by the
+                # other processes
+                self._merge()
+            self._entries = dict([(k, v) for k, v in self._entries.items()
+                                  if json.loads(k)[0] != file_type])
+        else:
+            self._entries = {}
+        if self._file_path:
+            self._write()
+
+
+_negative_cache = None
+
+
+def enableNegativeCache(ttl=DEFAULT_NEGATIVE_CACHE_TTL, persistent=False, file_path=None):
+    """ Switch on the cache of the failed lookups of getPath and getPaths
+    :param ttl: life time of the entries in seconds
+    :param persistent: store the entries on disk
+    :param file_path: the cache file. The default is in the per-user
+    cache directory.
+    """
+    global _negative_cache
+    if persistent and not file_path:
+        file_path = os.path.join(getUserCacheDir(), "negative_lookups.json")
+    _negative_cache = NegativeCache(ttl, file_path)
+
+
+def disableNegativeCache():
+    """ Switch off the cache of the failed lookups """
+    global _negative_cache
+    _negative_cache = None
+
+
+def getNegativeCache():
+    """ Get the current negative lookup cache. None if it is not enabled """
+    return _negative_cache
+
+
+def invalidateNegativeCache(file_type=None):
+    """ Drop the failed lookups from the cache
+    :param file_type: only drop the entries of this type of file
+    """
+    if _negative_cache:
+        _negative_cache.invalidate(file_type)
+
+
+if _getPositiveFloatEnv(NEGATIVE_CACHE_TTL_VAR):
+    enableNegativeCache(_getPositiveFloatEnv(NEGATIVE_CACHE_TTL_VAR),
+                        NEGATIVE_CACHE_FILE_VAR in os.environ,
+                        os.environ.get(NEGATIVE_CACHE_FILE_VAR, None))
+
+
+@_timed
 def getLocations(file_type="executable", exist_only=False, with_defaults=True):
     """
     Get the locations of a type of file -- including the default ones
     """
 
-    location_list = getLocationsFromEnv(VARIABLE[file_type], exist_only)
+    location_list = getLocationsFromEnv(VARIABLE[file_type])
 
     if with_defaults:
         location_list += DEFAULT_INSTALL_LOCATIONS[file_type]
 
     if exist_only:
-        location_list = [p for p in location_list if os.path.exists(p)]
+        location_list = _filterExistingLocations(location_list)
 
     return location_list
 
 
+@_timed
 def getPath(file_name, file_type="executable", raise_exception=True):
     """
     Get full path to the file name searched in the file-type path
@@ -90,7 +882,11 @@ def getPath(file_name, file_type="executable", raise_exception=True):
 
     location_list = getLocations(file_type)
 
-    result = getPathFromLocations(file_name, location_list)
+    result = None
+    if not (_negative_cache and _negative_cache.isMissing(file_type, file_name, location_list)):
+        result = getPathFromLocations(file_name, location_list)
+        if not result and _negative_cache:
+            _negative_cache.addMissing(file_type, file_name, location_list)
 
     if not result and raise_exception:
         raise Exception("The %s file \"%s\" cannot be found!" % (file_type, file_name))
@@ -98,6 +894,78 @@ def getPath(file_name, file_type="executable", raise_exception=True):
     return result
 
 
+def _getBatchIndex():
+    """ Get the location index to be used for a batch of lookups. Without
+    the global index, a temporary one is created: each directory is then
+    listed only once for the whole batch.
+    """
+    if _location_index:
+        return _location_index
+    return LocationIndex(check_interval=float("inf"))
+
+
+@_timed
+def getPaths(file_names, file_type="executable", raise_exception=True):
+    """
+    Get full paths to the file names searched in the file-type path. The
+    locations are listed only once for the whole list of names.
+    :param file_names: list of file names. They can contain sub directories.
+    :param file_type: the type of the searched files
+    :param raise_exception: raise an exception if any of the files is not found
+    :return: list of the full paths in the same order as the file names. None
+    for the files that are not found.
+    """
+
+    location_list = getLocations(file_type)
+    index = _getBatchIndex()
+
+    result = []
+    for file_name in file_names:
+        found = None
+        if not (_negative_cache and _negative_cache.isMissing(file_type, file_name, location_list)):
+            for l in location_list:
+                if _existsInLocation(l, file_name, index):
+                    _countHit(l)
+                    found = os.path.join(l, file_name)
+                    break
+            if not found and _negative_cache:
+                _negative_cache.addMissing(file_type, file_name, location_list)
+        result.append(found)
+
+    if raise_exception:
+        missing = [n for n, r in zip(file_names, result) if not r]
+        if missing:
+            raise Exception("The %s files \"%s\" cannot be found!" % (file_type, "\", \"".join(missing)))
+
+    return result
+
+
+@_timed
+def getAllPaths(file_names, file_type="executable"):
+    """
+    Get all the paths to the file names searched in the file-type path. The
+    locations are listed only once for the whole list of names.
+    :param file_names: list of file names. They can contain sub directories.
+    :param file_type: the type of the searched files
+    :return: list of the lists of full paths in the same order as the file names.
+    """
+
+    location_list = getLocations(file_type)
+    index = _getBatchIndex()
+
+    result = []
+    for file_name in file_names:
+        file_list = []
+        for l in location_list:
+            if _existsInLocation(l, file_name, index):
+                _countHit(l)
+                file_list.append(os.path.join(l, file_name))
+        result.append(removeDuplicates(file_list))
+
+    return result
+
+
+@_timed
 def getLocationsFromEnv(path_variable, exist_only=False):
     """
     Get the list of locations provided by the path
@@ -111,11 +979,12 @@ def getLocationsFromEnv(path_variable, exist_only=False):
         found_list = env_content.split(PATHSEP)
 
     if exist_only:
-        found_list = [p for p in found_list if os.path.exists(p)]
+        found_list = _filterExistingLocations(found_list)
 
     return found_list
 
 
+@_timed
 def getPathFromLocations(file_name, locations):
     """
     Get the path to the searched  file name from the
@@ -123,13 +992,14 @@ def getPathFromLocations(file_name, locations):
     """
 
     for l in locations:
-        file_path = os.path.join(l, file_name)
-        if os.path.exists(file_path):
-            return file_path
+        if _existsInLocation(l, file_name):
+            _countHit(l)
+            return os.path.join(l, file_name)
 
     return None
 
 
+@_timed
 def getAllPathFromLocations(file_name, locations):
     """
     Get all the paths to the searched  file name from the
@@ -139,9 +1009,9 @@ def getAllPathFromLocations(file_name, locations):
     file_list = []
 
     for l in locations:
-        file_path = os.path.join(l, file_name)
-        if os.path.exists(file_path):
-            file_list.append(file_path)
+        if _existsInLocation(l, file_name):
+            _countHit(l)
+            file_list.append(os.path.join(l, file_name))
 
     return removeDuplicates(file_list)
 
@@ -187,29 +1057,145 @@ def multiPathAppend(initial_locations, suffixes):
     return result
 
 
+def _isExecutable(fpath):
+    """ small function to check if the item is an executable """
+    _countStats("stat_calls", 2)
+    return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
+
+
+class CommandTable(object):
+    """ Shell-like hashed table of the commands found in the PATH.
+
+    The PATH directories are listed lazily, once, and the table maps each
+    entry name to the directories containing it. A hit is always checked
+    against the file system. The table is rebuilt when the PATH value
+    changes, or on a miss when the modification time of one of the
+    directories has changed. The relative directories (e.g. the empty
+    entry for the current directory) and the ones which cannot be listed
+    are probed at each lookup instead, like in the plain PATH search.
+    """
+
+    def __init__(self):
+        self._path_value = None
+        self._mtimes = []
+        self._commands = {}
+        self._probed = []
+
+    def rehash(self):
+        """ Forget all the remembered locations """
+        self._path_value = None
+        self._mtimes = []
+        self._commands = {}
+        self._probed = []
+
+    def _build(self, path_value):
+        """ List all the directories of the PATH value. The directories are
+        stored with their index in the PATH to keep the search order.
+        """
+        self.rehash()
+        self._path_value = path_value
+        for idx, path in enumerate(path_value.split(os.pathsep)):
+            path = path.strip('"')
+            if not os.path.isabs(path):
+                # depends on the current directory
+                self._probed.append((idx, path))
+                continue
+            _countStats("stat_calls", 2)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+            else:
+                try:
+                    with os.scandir(path) as it:
+                        for e in it:
+                            self._commands.setdefault(e.name, []).append((idx, path))
+                except OSError:
+                    # e.g. directory without read permission
+                    self._probed.append((idx, path))
+            self._mtimes.append((path, mtime))
+
+    def _isUpToDate(self):
+        """ Check the modification times of the PATH directories """
+        _countStats("stat_calls", len(self._mtimes))
+        for path, mtime in self._mtimes:
+            try:
+                current_mtime = os.stat(path).st_mtime
+            except OSError:
+                current_mtime = None
+            if current_mtime != mtime:
+                return False
+        return True
+
+    def _find(self, program):
+        """ Look for the program in the remembered and in the probed
+        directories, in the PATH order """
+        candidates = self._commands.get(program, [])
+        if self._probed:
+            candidates = sorted(candidates + self._probed)
+        for _, path in candidates:
+            exe_file = os.path.join(path, program)
+            if _isExecutable(exe_file):
+                return exe_file
+        return None
+
+    def find(self, program):
+        """ Get the full path of the program found in the PATH
+        :param program: program name without directory
+        :return: the full path or None
+        """
+        path_value = os.environ.get("PATH", "")
+        if path_value != self._path_value:
+            self._build(path_value)
+
+        exe_file = self._find(program)
+        if not exe_file and not self._isUpToDate():
+            self._build(path_value)
+            exe_file = self._find(program)
+
+        return exe_file
+
+
+_command_table = CommandTable()
+
+
+def rehash():
+    """ Forget the remembered locations of the executables used
+    by which, like the shell hash -r command
+    """
+    _command_table.rehash()
+
+
+@_timed
 def which(program):
     """ Command to assert the existance of an executable
         :param program: program path, absolute or relative
     """
 
-    def is_exe(fpath):
-        """ small function to check if the item is an executable """
-        return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
-
     fpath, _ = os.path.split(program)
     if fpath:
-        if is_exe(program):
+        if _isExecutable(program):
             return program
     else:
-        for path in os.environ["PATH"].split(os.pathsep):
-            path = path.strip('"')
-            exe_file = os.path.join(path, program)
-            if is_exe(exe_file):
-                return exe_file
+        return _command_table.find(program)
 
     return None
 
 
+_python_version = None
+
+
+def _getPythonVersion():
+    """ Get the (cached) version suffix of the python executable """
+    global _python_version
+    if _python_version is None:
+        _python_version = ""
+        m = re.match(r".*python(.*)$", sys.executable)
+        if m:
+            _python_version = m.group(1)
+    return _python_version
+
+
 def pyVersionWhich(program, program3_prefix=None):
     """ Version of which that returns the right executable
         depending on the calling python version.
@@ -217,14 +1203,11 @@ def pyVersionWhich(program, program3_prefix=None):
         :param program3: program3 prefix,
     """
     executable_name = None
-    python_version = ""
 
     if not program3_prefix:
         program3_prefix = program
 
-    m = re.match(r".*python(.*)$", sys.executable)
-    if m:
-        python_version = m.group(1)
+    python_version = _getPythonVersion()
 
     if python_version:
         executable_name = program3_prefix + python_version
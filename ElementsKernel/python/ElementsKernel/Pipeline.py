@@ -0,0 +1,167 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+In-process pipeline of Elements python programs.
+
+The steps are program modules (with defineSpecificProgramOptions and
+mainMethod) run one after the other in the same interpreter, each one
+with its own command line arguments and configuration file. When the
+mainMethod of a step returns an object which is not an exit code, this
+object is handed to the next step as the pipeline_input attribute of its
+arguments. An integer is an exit code: a non-zero one stops the pipeline.
+'''
+
+import os
+import sys
+import json
+import shlex
+import logging
+import argparse
+
+from ElementsKernel import Logging
+from ElementsKernel import Exit
+
+LOGGER = Logging.getLogger(__name__)
+
+
+class PipelineStep(object):
+    """ Step of a pipeline """
+
+    def __init__(self, module, args=None, program=None):
+        """
+        :param module: name of the program module
+        :param args: command line arguments of the step
+        :param program: name of the program, used for its configuration file.
+            The last component of the module name by default.
+        """
+        self.module = module
+        self.args = list(args or [])
+        self.program = program or module.split('.')[-1]
+
+    def __repr__(self):
+        return "PipelineStep(%r, %r, %r)" % (self.module, self.args, self.program)
+
+
+def readPipelineFile(pipeline_file):
+    """ Get the steps of a pipeline file. Each non-empty line which is not a
+    comment is a step, either as a JSON object with the "module", "args"
+    and "program" keys, or as the module name followed by its arguments
+    like a shell command line.
+    :param pipeline_file: path to the pipeline file
+    :return: the list of the steps
+    """
+    steps = []
+    with open(pipeline_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                step = json.loads(line)
+                steps.append(PipelineStep(step["module"], [str(a) for a in step.get("args", [])],
+                                          step.get("program", None)))
+            else:
+                tokens = shlex.split(line)
+                steps.append(PipelineStep(tokens[0], tokens[1:]))
+    return steps
+
+
+def runPipeline(steps, search_dirs=None, program_dir=None, elements_loglevel=logging.DEBUG):
+    """ Run the steps of a pipeline in the current interpreter
+    :param steps: list of PipelineStep
+    :param search_dirs: search directories of the programs. By default the
+        installation directory of the program directory.
+    :param program_dir: directory of the (virtual) executables of the steps.
+        The one of the current executable by default.
+    :param elements_loglevel: log level of the messages of the framework
+    :return: the (exit code, result) pair. The result is the object returned
+        by the last step, None if it returned an exit code.
+    """
+    from ElementsKernel.Program import Program
+
+    if program_dir is None:
+        program_dir = os.path.dirname(os.path.realpath(sys.argv[0]))
+    if not search_dirs:
+        search_dirs = [os.path.dirname(program_dir)]
+
+    old_argv = sys.argv
+    result = None
+    exit_code = Exit.Code["OK"]
+    try:
+        for idx, step in enumerate(steps):
+            LOGGER.info("Pipeline step %d/%d: %s", idx + 1, len(steps), step.module)
+            sys.argv = [os.path.join(program_dir, step.program)] + step.args
+            try:
+                program = Program(step.module, search_dirs=search_dirs,
+                                  original_path=sys.argv[0],
+                                  elements_loglevel=elements_loglevel)
+                program.setPipelineInput(result)
+                exit_code = program.runProgram()
+            except SystemExit as e:
+                # e.g. wrong options of the step
+                exit_code = e.code if isinstance(e.code, int) else Exit.Code["NOT_OK"]
+            if exit_code is None:
+                exit_code = Exit.Code["OK"]
+            if exit_code != Exit.Code["OK"]:
+                LOGGER.error("The pipeline step %s failed with the exit code %d", step.module, exit_code)
+                return exit_code, None
+            result = program.getResult()
+            # restore the environment of the pipeline for the next step
+            program = None
+    finally:
+        sys.argv = old_argv
+
+    return exit_code, result
+
+
+def defineSpecificProgramOptions():
+    """
+    @brief Allows to define the (command line and configuration file) options
+    specific to this program
+
+    @details
+        See the Elements documentation for more details.
+    @return
+        An  ArgumentParser.
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('pipeline_file', metavar='pipeline-file',
+                        help='File describing the steps of the pipeline: one step per line, '
+                             'as "<module> <arguments>" or as a JSON object with the '
+                             '"module", "args" and "program" keys')
+
+    return parser
+
+
+def mainMethod(args):
+    """
+    @brief The "main" method.
+    @details
+        This method is the entry point to the program. In this sense, it is
+        similar to a main (and it is why it is called mainMethod()).
+    """
+
+    steps = readPipelineFile(args.pipeline_file)
+    LOGGER.info("Running the %d steps of %s", len(steps), args.pipeline_file)
+    exit_code, _ = runPipeline(steps)
+
+    return exit_code
@@ -0,0 +1,475 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+Profiling tools for the Elements programs. This module is imported by the
+program launchers before the other Elements modules: it must stay light
+and only depend on the standard library.
+'''
+
+import os
+import sys
+import time
+import signal
+import json
+from collections import OrderedDict
+
+
+class _TimedLoader(object):
+    """ Wrapper of a module loader measuring the execution of the module """
+
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        """ Delegate the creation of the module to the wrapped loader """
+        create_module = getattr(self._loader, "create_module", None)
+        if create_module is None:
+            return None
+        return create_module(spec)
+
+    def exec_module(self, module):
+        """ Execute the module with the wrapped loader and record the time """
+        # Restore the original loader first: the module must not keep a
+        # reference to the wrapper
+        module.__loader__ = self._loader
+        if getattr(module, "__spec__", None) is not None:
+            module.__spec__.loader = self._loader
+        self._timer._execModule(self._loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer(object):
+    """ Meta path finder recording the import time of each module, like the
+    "-X importtime" option of the python interpreter.
+
+    For each module imported while the timer is started, the time spent
+    to find it, the time spent executing its own body ("self") and the
+    total time including its nested imports ("cumulative") are recorded.
+    """
+
+    def __init__(self):
+        self._records = OrderedDict()
+        self._children = []
+        self._finding = False
+
+    def start(self):
+        """ Install the timer in front of the import machinery """
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def stop(self):
+        """ Remove the timer from the import machinery """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        """ Find the module with the next finders and wrap its loader """
+        if self._finding:
+            return None
+        self._finding = True
+        start = time.time()
+        spec = None
+        try:
+            for finder in sys.meta_path:
+                find_spec = getattr(finder, "find_spec", None)
+                if finder is self or find_spec is None:
+                    continue
+                spec = find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._finding = False
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return None
+        self._records[fullname] = {"find": time.time() - start,
+                                   "self": 0.0, "cumulative": 0.0}
+        spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _execModule(self, loader, module):
+        """ Execute the module and split its time between itself and its
+        nested imports
+        """
+        self._children.append(0.0)
+        start = time.time()
+        try:
+            loader.exec_module(module)
+        finally:
+            cumulative = time.time() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            record = self._records.setdefault(module.__name__, {"find": 0.0})
+            record["self"] = cumulative - children
+            record["cumulative"] = cumulative
+
+    def getRecords(self):
+        """ Get the import records sorted by decreasing cumulative time """
+        records = []
+        for name, record in self._records.items():
+            entry = {"module": name}
+            entry.update(record)
+            records.append(entry)
+        return sorted(records, key=lambda r: r["cumulative"], reverse=True)
+
+
+_import_timer = None
+
+
+def startImportTimer():
+    """ Start recording the import time of the modules. Called by the
+    program launcher before importing the Elements modules.
+    """
+    global _import_timer
+    if _import_timer is None:
+        _import_timer = ImportTimer()
+    _import_timer.start()
+    return _import_timer
+
+
+def stopImportTimer():
+    """ Stop recording the import time of the modules. The records are
+    kept and still available from getImportTimer.
+    """
+    if _import_timer is not None:
+        _import_timer.stop()
+    return _import_timer
+
+
+def getImportTimer():
+    """ Get the started import timer. None if it has never been started """
+    return _import_timer
+
+
+def runProfiled(output_file, func, *args, **kwargs):
+    """ Call a function under cProfile and write the collected statistics
+    as a pstats file, even if the function raises an exception
+    :param output_file: path to the pstats output file
+    :param func: function to be profiled
+    :return: the return value of the function
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(output_file)
+
+
+class SamplingProfiler(object):
+    """ Statistical profiler sampling the python stacks of all the threads
+    with an interval timer.
+
+    The timer (ITIMER_PROF) counts the CPU time of the process and sends a
+    SIGPROF signal at each interval. The signal handler only counts the
+    stacks, the formatting is done when the result is written. The output
+    is the "collapsed stack" format of the flamegraph tools: one line per
+    distinct stack with the frames from the root to the leaf separated by
+    ";" and followed by the number of samples.
+
+    The signal handlers can only be installed from the main thread.
+    """
+
+    def __init__(self, frequency, output_file, dump_signal=None):
+        """
+        :param frequency: number of samples per second of CPU time
+        :param output_file: path to the collapsed stack output file
+        :param dump_signal: optional signal triggering the writing of the
+            current samples while the profiler runs
+        """
+        if frequency <= 0:
+            raise ValueError("The sampling frequency must be positive: %s" % frequency)
+        self._interval = 1.0 / frequency
+        self._output_file = output_file
+        self._dump_signal = dump_signal
+        self._counts = {}
+        self._samples = 0
+        self._old_handlers = {}
+        self._main_thread_id = None
+
+    def _sample(self, _, frame):
+        """ Signal handler counting the current stack of each thread """
+        self._samples += 1
+        for thread_id, thread_frame in sys._current_frames().items():
+            if thread_id == self._main_thread_id:
+                # skip the frame of this handler
+                thread_frame = frame
+            codes = []
+            while thread_frame is not None:
+                codes.append(thread_frame.f_code)
+                thread_frame = thread_frame.f_back
+            key = (thread_id, tuple(codes))
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _dump(self, *_):
+        """ Signal handler writing the current samples """
+        self.write()
+
+    def start(self):
+        """ Install the signal handlers and start the interval timer """
+        import threading
+        self._main_thread_id = threading.current_thread().ident
+        self._old_handlers[signal.SIGPROF] = signal.signal(signal.SIGPROF, self._sample)
+        if self._dump_signal is not None:
+            self._old_handlers[self._dump_signal] = signal.signal(self._dump_signal, self._dump)
+        signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+
+    def stop(self):
+        """ Stop the interval timer and restore the signal handlers """
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        for signum, handler in self._old_handlers.items():
+            signal.signal(signum, handler)
+        self._old_handlers = {}
+
+    def getSampleCount(self):
+        """ Get the number of samples taken """
+        return self._samples
+
+    def getCollapsedStacks(self):
+        """ Get the collapsed stack lines, sorted by decreasing count """
+        lines = []
+        for (thread_id, codes), count in list(self._counts.items()):
+            if thread_id == self._main_thread_id:
+                frames = ["MainThread"]
+            else:
+                frames = ["Thread-%d" % thread_id]
+            for code in reversed(codes):
+                frames.append("%s (%s:%d)" % (code.co_name, code.co_filename, code.co_firstlineno))
+            lines.append((count, ";".join(frames)))
+        return ["%s %d" % (stack, count) for count, stack in sorted(lines, reverse=True)]
+
+    def write(self, output_file=None):
+        """ Write the collapsed stacks
+        :param output_file: path to the output file. The one of the
+            profiler by default.
+        """
+        output_file = output_file or self._output_file
+        tmp_file = "%s.%d.tmp" % (output_file, os.getpid())
+        with open(tmp_file, "w") as f:
+            for line in self.getCollapsedStacks():
+                f.write(line + "\n")
+        os.rename(tmp_file, output_file)
+        return output_file
+
+
+class MemoryTracer(object):
+    """ Track the memory allocations with tracemalloc.
+
+    A snapshot is taken when the tracer starts, at regular intervals (from
+    a daemon thread), on a signal and when the tracer stops. Only the first
+    and the last snapshots are kept: for each new snapshot, the growth with
+    respect to the previous one is summarized and the previous snapshot is
+    dropped.
+    """
+
+    def __init__(self, frames=1, interval=None, snapshot_signal=None, top=10):
+        """
+        :param frames: number of frames stored per allocation traceback
+        :param interval: optional number of seconds between two snapshots
+        :param snapshot_signal: optional signal triggering a snapshot
+        :param top: number of allocation sites in the summaries
+        """
+        import threading
+        if frames < 1:
+            raise ValueError("The number of frames must be positive: %s" % frames)
+        self._frames = frames
+        self._interval = interval
+        self._snapshot_signal = snapshot_signal
+        self._top = top
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._old_handler = None
+        self._first = None
+        self._last = None
+        self._growths = []
+        self._start_time = None
+        self._peak = 0
+
+    def _filter(self, snapshot):
+        import tracemalloc
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)))
+
+    def _formatStats(self, stats):
+        lines = []
+        for stat in stats[:self._top]:
+            frame = stat.traceback[0]
+            size_diff = getattr(stat, "size_diff", None)
+            if size_diff is None:
+                lines.append("%s:%d: %d kB in %d blocks" % (frame.filename, frame.lineno,
+                                                           stat.size // 1024, stat.count))
+            else:
+                lines.append("%s:%d: %+d kB (%d kB in %d blocks)" % (frame.filename, frame.lineno,
+                                                                     size_diff // 1024,
+                                                                     stat.size // 1024, stat.count))
+        return lines
+
+    def takeSnapshot(self, blocking=True):
+        """ Take a snapshot and summarize the growth since the previous one
+        :param blocking: wait for a concurrent snapshot to complete. If False,
+            the snapshot is skipped when another one is in progress.
+        :return: True if the snapshot has been taken
+        """
+        import tracemalloc
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            snapshot = self._filter(tracemalloc.take_snapshot())
+            if self._last is not None:
+                stats = snapshot.compare_to(self._last, "lineno")
+                current, _ = tracemalloc.get_traced_memory()
+                self._growths.append((time.time() - self._start_time, current,
+                                      self._formatStats([s for s in stats if s.size_diff > 0])))
+            if self._first is None:
+                self._first = snapshot
+            self._last = snapshot
+        finally:
+            self._lock.release()
+        return True
+
+    def _onSignal(self, *_):
+        # a snapshot may be in progress in the main thread
+        self.takeSnapshot(blocking=False)
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            self.takeSnapshot()
+
+    def start(self):
+        """ Start tracing the allocations and take the first snapshot """
+        import threading
+        import tracemalloc
+        tracemalloc.start(self._frames)
+        self._start_time = time.time()
+        self.takeSnapshot()
+        if self._snapshot_signal is not None:
+            self._old_handler = signal.signal(self._snapshot_signal, self._onSignal)
+        if self._interval:
+            self._thread = threading.Thread(target=self._run, name="ElementsMemoryTracer")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Take the last snapshot and stop tracing the allocations """
+        import tracemalloc
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        if self._old_handler is not None:
+            signal.signal(self._snapshot_signal, self._old_handler)
+            self._old_handler = None
+        self.takeSnapshot()
+        self._peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def getGrowths(self):
+        """ Get the (elapsed seconds, traced bytes, top growth lines) summary
+        of each snapshot after the first one
+        """
+        return self._growths
+
+    def getReport(self):
+        """ Get the report lines: the top allocation sites of the last
+        snapshot, the total growth and the growth between the snapshots
+        """
+        lines = ["Peak traced memory: %d kB" % (self._peak // 1024)]
+        lines.append("Top allocation sites:")
+        lines.extend(["  " + l for l in self._formatStats(self._last.statistics("lineno"))])
+        lines.append("Growth since the start:")
+        stats = self._last.compare_to(self._first, "lineno")
+        lines.extend(["  " + l for l in self._formatStats([s for s in stats if s.size_diff > 0])])
+        # with only the start and stop snapshots, the growth is the total one
+        if len(self._growths) < 2:
+            return lines
+        for elapsed, current, growth in self._growths:
+            lines.append("Growth at %.1f s (%d kB traced):" % (elapsed, current // 1024))
+            lines.extend(["  " + l for l in growth])
+        return lines
+
+
+def _getRusage(who):
+    """ Get the resource usage of the process or of its children """
+    import resource
+    usage = resource.getrusage(who)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        max_rss = usage.ru_maxrss
+    else:
+        max_rss = usage.ru_maxrss * 1024
+    return OrderedDict([("max_rss_bytes", max_rss),
+                        ("user_cpu_seconds", usage.ru_utime),
+                        ("system_cpu_seconds", usage.ru_stime),
+                        ("voluntary_context_switches", usage.ru_nvcsw),
+                        ("involuntary_context_switches", usage.ru_nivcsw),
+                        ("block_input_operations", usage.ru_inblock),
+                        ("block_output_operations", usage.ru_oublock)])
+
+
+def _getProcIo(io_file="/proc/self/io"):
+    """ Get the I/O counters of the process. They include the counters of
+    the terminated and waited for children. None if not available (non
+    Linux system).
+    """
+    io_keys = {"rchar": "read_chars", "wchar": "written_chars",
+               "read_bytes": "read_bytes", "write_bytes": "written_bytes"}
+    counters = OrderedDict()
+    try:
+        with open(io_file) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in io_keys:
+                    counters[io_keys[key]] = int(value)
+    except (IOError, OSError, ValueError):
+        return None
+    return counters
+
+
+def getResourceUsage():
+    """ Get the resource usage of the process ("self") and of its terminated
+    children ("children"): peak RSS, CPU times, context switches and block
+    operations. The "io" entry holds the bytes read and written from
+    /proc/self/io, when available.
+    """
+    import resource
+    usage = OrderedDict()
+    usage["self"] = _getRusage(resource.RUSAGE_SELF)
+    usage["children"] = _getRusage(resource.RUSAGE_CHILDREN)
+    io_counters = _getProcIo()
+    if io_counters is not None:
+        usage["io"] = io_counters
+    return usage
+
+
+def writeReport(report, file_name):
+    """ Write a profiling report as a JSON file
+    :param report: dictionary holding the report
+    :param file_name: path to the output file
+    """
+    with open(file_name, "w") as f:
+        json.dump(report, f, indent=2)
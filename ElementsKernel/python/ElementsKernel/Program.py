@@ -22,12 +22,240 @@ import importlib
 import os
 import sys
 import re
+import time
+from collections import OrderedDict
 from ElementsKernel import Logging
 import logging
-from ElementsKernel.Path import VARIABLE, SUFFIXES, joinPath, multiPathAppend
+from ElementsKernel.Path import VARIABLE, SUFFIXES, joinPath, multiPathAppend, getStats, openFile
+from ElementsKernel.Path import getUserCacheDir, getAllPathFromLocations
 from ElementsKernel.Environment import Environment
 from ElementsKernel.Configuration import getConfigurationPath, getConfigurationLocations
 from ElementsKernel import Exit
+from ElementsKernel import Concurrency
+from ElementsKernel import Sharding
+
+
+CONFIG_CACHE_VAR = "ELEMENTS_CONFIG_CACHE"
+
+LAYERED_CONFIG_VAR = "ELEMENTS_LAYERED_CONFIG"
+
+_VALUE_SPLIT_RE = re.compile(r'''((?:[^ "']|"[^"]*"|'[^']*')+)''')
+
+_config_cache = {}
+
+
+def tokenizeConfigFile(f):
+    """ Get the list of the (key, values) options of a configuration file
+    :param f: the opened configuration file
+    """
+    tokens = []
+    for line in f.readlines():
+        line = line.strip()
+        if line.startswith('#') or not '=' in line:
+            continue
+        key, value = line.split('=', 1)
+        key = key.strip()
+        value = value.strip()
+        if '#' in value:
+            value = value[:value.find('#')]
+        tokens.append((key, _VALUE_SPLIT_RE.split(value)[1::2]))
+    return tokens
+
+
+def _getConfigCacheFile(config_file):
+    """ Get the path of the on-disk cache file of a configuration file """
+    # the modules of the on-disk cache are only imported when it is used
+    import hashlib
+    digest = hashlib.sha1(os.path.abspath(config_file).encode("utf-8")).hexdigest()
+    return os.path.join(getUserCacheDir(), "config", digest + ".json")
+
+
+def _loadConfigCache(config_file, key):
+    """ Get the tokens of a configuration file from the on-disk cache. None
+    if they are not available or outdated.
+    """
+    import json
+    try:
+        with open(_getConfigCacheFile(config_file)) as f:
+            cached = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if cached.get("key") != list(key):
+        return None
+    return [(k, v) for k, v in cached["tokens"]]
+
+
+def _saveConfigCache(config_file, key, tokens):
+    """ Store the tokens of a configuration file in the on-disk cache """
+    import json
+    import tempfile
+    cache_file = _getConfigCacheFile(config_file)
+    try:
+        if not os.path.isdir(os.path.dirname(cache_file)):
+            os.makedirs(os.path.dirname(cache_file))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, "w") as f:
+            json.dump({"key": list(key), "tokens": tokens}, f)
+        os.replace(tmp_path, cache_file)
+    except (IOError, OSError):
+        pass
+
+
+def getConfigFileTokens(config_file):
+    """ Get the (key, values) options of a configuration file. The result is
+    cached in the process, and on disk in the user cache directory if the
+    ELEMENTS_CONFIG_CACHE environment variable is set. The cache entries are
+    keyed by the path, the size and the modification time of the file.
+    :param config_file: path to the configuration file
+    """
+    try:
+        file_stat = os.stat(config_file)
+        key = (os.path.abspath(config_file), file_stat.st_size, file_stat.st_mtime)
+    except OSError:
+        # e.g. member of an archive location
+        key = None
+
+    if key and key in _config_cache:
+        return _config_cache[key]
+
+    tokens = None
+    use_disk_cache = key and CONFIG_CACHE_VAR in os.environ
+    if use_disk_cache:
+        tokens = _loadConfigCache(config_file, key)
+
+    if tokens is None:
+        with openFile(config_file) as f:
+            tokens = tokenizeConfigFile(f)
+        if use_disk_cache:
+            _saveConfigCache(config_file, key, tokens)
+
+    if key:
+        _config_cache[key] = tokens
+
+    return tokens
+
+
+class LayeredConfiguration(object):
+    """ Merge of the same-named configuration files found in the
+    configuration locations.
+
+    The files are given by decreasing precedence (the order of the
+    ELEMENTS_CONF_PATH locations): a key takes the value of the first file
+    defining it. All the files are parsed, to check all their keys.
+    """
+
+    def __init__(self, config_files):
+        self._config_files = list(config_files)
+        # (values, source file) of each key
+        self._merged = OrderedDict()
+        for config_file in self._config_files:
+            for key, values in getConfigFileTokens(config_file):
+                if key not in self._merged:
+                    self._merged[key] = (values, config_file)
+
+    def getFiles(self):
+        """ Get the configuration files by decreasing precedence """
+        return self._config_files
+
+    def get(self, key, default=None):
+        """ Get the values of a key """
+        if key not in self._merged:
+            return default
+        return self._merged[key][0]
+
+    def getSource(self, key):
+        """ Get the configuration file providing the value of the key """
+        if key not in self._merged:
+            return None
+        return self._merged[key][1]
+
+    def items(self):
+        """ Get the merged list of the (key, values) options """
+        return [(key, values) for key, (values, _) in self._merged.items()]
+
+
+def readBatchFile(batch_file):
+    """ Get the argument sets of a batch file. Each non-empty line which
+    is not a comment is an argument set:
+      - a JSON list is taken as the list of the arguments
+      - a JSON object maps the option names (without the leading "--") to
+        their values. A list value gives several arguments, True gives a
+        flag and False or null skips the option
+      - any other line is split like a shell command line
+    :param batch_file: path to the batch file
+    :return: the list of (line number, arguments) pairs
+    """
+    import json
+    import shlex
+    entries = []
+    with open(batch_file) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('['):
+                tokens = [str(t) for t in json.loads(line)]
+            elif line.startswith('{'):
+                tokens = []
+                for key, value in json.loads(line, object_pairs_hook=OrderedDict).items():
+                    if value is None or value is False:
+                        continue
+                    tokens.append('--' + key)
+                    if value is True:
+                        continue
+                    if isinstance(value, list):
+                        tokens.extend([str(v) for v in value])
+                    else:
+                        tokens.append(str(value))
+            else:
+                tokens = shlex.split(line)
+            entries.append((line_no, tokens))
+    return entries
+
+
+_batch_program = None
+
+# inspect.CO_COROUTINE. The asyncio and inspect modules are only imported
+# by the programs which need them
+_CO_COROUTINE = 0x80
+
+
+def isCoroutineFunction(func):
+    """ Check if a function is a coroutine function (async def) """
+    code = getattr(func, "__code__", None)
+    return bool(code is not None and code.co_flags & _CO_COROUTINE)
+
+
+def _getLoopPolicy(name):
+    """ Get the event loop policy class from its "module.Class" name """
+    module_name, _, class_name = name.rpartition('.')
+    if not module_name:
+        raise ValueError("The event loop policy must be given as module.Class: %s" % name)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _runBatchEntry(entry):
+    """ Run a batch entry in a worker process (forked from the program)
+    :return: the exit code and the result of the entry
+    """
+    exit_code = _batch_program._runBatchEntry(entry)
+    return exit_code, _batch_program.getResult()
+
+
+def _getIntArgument(argv, option):
+    """ Get the integer value of an option from the command line arguments,
+    before their parsing. None if the option is not found or not valid.
+    """
+    value = None
+    for idx, arg in enumerate(argv):
+        if arg == option and idx + 1 < len(argv):
+            value = argv[idx + 1]
+        elif arg.startswith(option + '='):
+            value = arg[len(option) + 1:]
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
 
 
 def str_to_bool(s):
@@ -47,6 +275,10 @@ class Program(object):
                  search_dirs=None, original_path="",
                  elements_loglevel=logging.DEBUG,
                  use_config_file=True):
+        # The thread limit of the native libraries has to be set before the
+        # import of the program module (and of e.g. numpy)
+        Concurrency.configure(_getIntArgument(sys.argv[1:], '--num-threads'),
+                              _getIntArgument(sys.argv[1:], '--num-processes'))
         self._app_module = importlib.import_module(app_module)
         self._logger = Logging.getLogger('ElementsProgram')
         self._elements_loglevel = elements_loglevel
@@ -60,14 +292,29 @@ class Program(object):
         self._program_path = os.path.dirname(original_path)
         self._program_name = os.path.basename(original_path)
         self._env = Environment()
+        self._phase_times = OrderedDict()
+        self._sampling_profiler = None
+        self._metrics_file = None
+        self._memory_tracer = None
+        self._arg_parser = None
+        self._base_options = []
+        self._pipeline_input = None
+        self._has_pipeline_input = False
+        self._result = None
+        self._generic_dests = set()
 
-    @staticmethod
-    def _setupLogging(arg_parser):
+    def _setupLogging(self, arg_parser):
         options = arg_parser.parse_known_args()[0]
         if options.log_level:
             Logging.setLevel(options.log_level.upper())
         if options.log_file:
-            Logging.setLogFile(options.log_file)
+            log_file = options.log_file
+            shard_count = self._getGenericOption(options, "shard_count")
+            if shard_count and shard_count > 1:
+                log_file = Sharding.getShardFileName(log_file,
+                                                     self._getGenericOption(options, "shard_index") or 0,
+                                                     shard_count)
+            Logging.setLogFile(log_file)
 
     def _findConfigFile(self):
         # Create the path which represents the package of the module (if any)
@@ -114,35 +361,92 @@ class Program(object):
 
         return default_config_file
 
+    def getDefaultConfigFiles(self, program_name, module_name):
+        """ Get all the default configuration files found in the
+        configuration locations, by decreasing precedence
+        """
+        conf_name = os.path.splitext(program_name)[0] + '.conf'
+
+        config_files = getAllPathFromLocations(conf_name, getConfigurationLocations())
+
+        if not config_files:
+            if not module_name and '.' in self._app_module.__name__:
+                module_name = self._app_module.__name__[:self._app_module.__name__.index('.')]
+                module_name = module_name.replace('.', os.sep)
+            if module_name:
+                conf_name = os.sep.join([module_name, conf_name])
+                config_files = getAllPathFromLocations(conf_name, getConfigurationLocations())
+
+        for f in config_files:
+            self._logger.debug('Found "%s" configuration layer at %s', conf_name, f)
+
+        return config_files
+
     def _parseConfigFile(self, arg_parser):
+        start = time.time()
+        conf = self._readConfigFile(arg_parser)
+        self._phase_times["config"] = time.time() - start
+        return conf
+
+    def _readConfigFile(self, arg_parser):
         # First we check if the user gave the --config-file option
-        config_file = arg_parser.parse_known_args()[0].config_file
+        known_options = arg_parser.parse_known_args()[0]
+        config_file = known_options.config_file
+        layers = None
         if not config_file:
-            config_file = self.getDefaultConfigFile(self._program_name,
-                                                    self._elements_module_name)
+            if known_options.layered_config:
+                layers = LayeredConfiguration(self.getDefaultConfigFiles(self._program_name,
+                                                                         self._elements_module_name))
+            else:
+                config_file = self.getDefaultConfigFile(self._program_name,
+                                                        self._elements_module_name)
         conf = []
-        if config_file:
-            with open(config_file) as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if line.startswith('#') or not '=' in line:
-                        continue
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    # If the key is not mapping to any of the actions defined in
-                    # the parser, fail with an error messsage
-                    if not [act for act in arg_parser._actions if ('--' + key) in act.option_strings]:
-                        self._logger.error('Unknown option "{}" in configuration file {}'.format(key, config_file))
-                        exit(Exit.Code["NOT_OK"])
-                    value = value.strip()
-                    if '#' in value:
-                        value = value[:value.find('#')]
-                    conf.append('--' + key)
-                    for v in re.split(r'''((?:[^ "']|"[^"]*"|'[^']*')+)''', value)[1::2]:
-                        conf.append(v)
+        if config_file or (layers and layers.getFiles()):
+            if layers:
+                tokens = layers.items()
+            else:
+                tokens = getConfigFileTokens(config_file)
+            # Index of the actions by option string, built once for all the keys
+            option_index = {}
+            for act in arg_parser._actions:
+                for opt in act.option_strings:
+                    option_index[opt] = act
+            for key, values in tokens:
+                # If the key is not mapping to any of the actions defined in
+                # the parser, fail with an error messsage
+                if ('--' + key) not in option_index:
+                    if layers:
+                        config_file = layers.getSource(key)
+                    self._logger.error('Unknown option "{}" in configuration file {}'.format(key, config_file))
+                    exit(Exit.Code["NOT_OK"])
+                conf.append('--' + key)
+                conf.extend(values)
         return conf
 
+    @staticmethod
+    def _addGenericOption(arg_parser, group, *option_strings, **kwargs):
+        """ Add a generic option to the parser of the program, unless the
+        program already defines one of its option strings or its destination.
+        The option of the program is then kept, and the related generic
+        feature is not available.
+        :return: the added action, None if the option has been skipped
+        """
+        dest = kwargs.get("dest", option_strings[0].lstrip('-').replace('-', '_'))
+        conflicts = [o for o in option_strings if o in arg_parser._option_string_actions]
+        if conflicts or dest in [a.dest for a in arg_parser._actions]:
+            return None
+        return group.add_argument(*option_strings, **kwargs)
+
+    def _getGenericOption(self, args, dest, default=None):
+        """ Get the value of a generic option. The default is returned if
+        the option has been skipped because the program defines its own.
+        """
+        if dest in self._generic_dests:
+            return getattr(args, dest, default)
+        return default
+
     def _parseParameters(self):
+        start = time.time()
         # Get the argument parser with the user options
         arg_parser = self._app_module.defineSpecificProgramOptions()
         # Add all the options which are common to all the programs
@@ -150,11 +454,100 @@ class Program(object):
         if self._use_config_file:
             group.add_argument(
                 '--config-file', help='Name of a configuration file')
+            group.add_argument(
+                '--layered-config', action='store_true',
+                default=(LAYERED_CONFIG_VAR in os.environ),
+                help='Merge the default configuration files found in all the configuration locations '
+                     '(default if the %s environment variable is set)' % LAYERED_CONFIG_VAR)
+            group.add_argument(
+                '--no-layered-config', dest='layered_config', action='store_false',
+                help='Only use the first default configuration file found, even if the %s '
+                     'environment variable is set' % LAYERED_CONFIG_VAR)
         group.add_argument('--log-file', help='Name of a log file')
         group.add_argument(
             '--log-level', help='Log level: FATAL, ERROR, WARN, INFO (default), DEBUG')
+        self._addGenericOption(
+            arg_parser, group, '--profile-startup', action='store_true',
+            help='Report the time spent to start the program (imports, bootstrap, option parsing)')
+        self._addGenericOption(
+            arg_parser, group, '--profile-startup-output', metavar='JSON_FILE',
+            help='Name of the JSON file receiving the startup report (implies --profile-startup). '
+                 'Default: the report is logged')
+        self._addGenericOption(
+            arg_parser, group, '--profile', action='store_true',
+            help='Profile the main method of the program with cProfile')
+        self._addGenericOption(
+            arg_parser, group, '--profile-output', metavar='PSTATS_FILE',
+            help='Name of the cProfile output file (implies --profile). '
+                 'Default: <program name>.<pid>.prof')
+        self._addGenericOption(
+            arg_parser, group, '--sample-profile', type=float, metavar='HZ',
+            help='Sample the python stacks of all the threads at the given frequency '
+                 '(per second of CPU time) and write them in the flamegraph collapsed format. '
+                 'The current samples are also written on SIGUSR1')
+        self._addGenericOption(
+            arg_parser, group, '--sample-profile-output', metavar='FOLDED_FILE',
+            help='Name of the sampling profiler output file. '
+                 'Default: <program name>.<pid>.folded')
+        if isCoroutineFunction(self._app_module.mainMethod):
+            self._addGenericOption(
+                arg_parser, group, '--event-loop-policy', metavar='MODULE.CLASS',
+                help='Event loop policy used to run the main method coroutine '
+                     '(e.g. uvloop.EventLoopPolicy). Default: the asyncio one')
+            self._addGenericOption(
+                arg_parser, group, '--executor-workers', type=int, metavar='N',
+                help='Number of threads of the default executor of the event loop')
+        self._addGenericOption(
+            arg_parser, group, '--num-threads', type=int, metavar='N',
+            help='Number of threads of the shared executor and of the native libraries '
+                 '(OMP_NUM_THREADS, OPENBLAS_NUM_THREADS, MKL_NUM_THREADS, ...)')
+        self._addGenericOption(
+            arg_parser, group, '--num-processes', type=int, metavar='N',
+            help='Number of processes of the shared executor. Without --num-threads, '
+                 'the CPUs are shared between the processes for the native libraries')
+        self._addGenericOption(
+            arg_parser, group, '--shard-index', type=int, default=0, metavar='INDEX',
+            help='Index of the shard of the work processed by the program, from 0 (default: 0)')
+        self._addGenericOption(
+            arg_parser, group, '--shard-count', type=int, default=1, metavar='COUNT',
+            help='Number of shards of the work (default: 1). The log file name is '
+                 'suffixed with the shard index')
+        self._addGenericOption(
+            arg_parser, group, '--checkpoint-dir', metavar='DIR',
+            help='Directory of the checkpoint written by the main method')
+        self._addGenericOption(
+            arg_parser, group, '--resume', action='store_true',
+            help='Resume the work from the checkpoint of a previous run with the same options')
+        self._addGenericOption(
+            arg_parser, group, '--checkpoint-interval', type=float, default=0.0, metavar='SECONDS',
+            help='Minimum interval between two checkpoint writes (default: 0)')
+        self._addGenericOption(
+            arg_parser, group, '--batch-file', metavar='FILE',
+            help='Run the program for each argument set of the file (one per line, '
+                 'as a command line, a JSON list or a JSON object). The command line '
+                 'and configuration options are shared by all the argument sets')
+        self._addGenericOption(
+            arg_parser, group, '--batch-workers', type=int, default=1, metavar='N',
+            help='Number of worker processes of the --batch-file mode (default: 1)')
+        self._addGenericOption(
+            arg_parser, group, '--trace-memory', action='store_true',
+            help='Trace the memory allocations of the main method with tracemalloc. The top '
+                 'allocation sites and their growth are reported at the end. A snapshot is '
+                 'also taken on SIGUSR2')
+        self._addGenericOption(
+            arg_parser, group, '--trace-memory-frames', type=int, metavar='N',
+            help='Number of frames stored per allocation by --trace-memory (default: 1, '
+                 'implies --trace-memory)')
+        self._addGenericOption(
+            arg_parser, group, '--trace-memory-interval', type=float, metavar='SECONDS',
+            help='Interval between two memory snapshots of --trace-memory')
+        self._addGenericOption(
+            arg_parser, group, '--metrics-file', metavar='JSON_FILE',
+            help='Name of a JSON file receiving the exit code, the phase timing '
+                 'and the resource usage of the program')
         group.add_argument(
             '--version', action='version', version=self.getVersion())
+        self._generic_dests = set([a.dest for a in group._group_actions])
         # Setup the logging
         self._setupLogging(arg_parser)
         # Get the options from the config file
@@ -166,20 +559,29 @@ class Program(object):
         # are after the ones from the configuration file, they are going to
         # override them (argparse behavior)
         options.extend(sys.argv[1:])
+        # Kept for the parsing of the batch entries
+        self._arg_parser = arg_parser
+        self._base_options = list(options)
         # Now redo the parsing with all the options
         all_options = arg_parser.parse_args(options)
+        try:
+            Sharding.configure(self._getGenericOption(all_options, "shard_index"),
+                               self._getGenericOption(all_options, "shard_count"))
+        except ValueError as e:
+            arg_parser.error(str(e))
 
         # We create a map of the variable names to the option names to be used
         # for further references
         variable_to_option_name = {}
+        # Index of the first action with option strings for each variable
+        dest_index = {}
+        for a in arg_parser._actions:
+            if a.option_strings and a.dest not in dest_index:
+                dest_index[a.dest] = a
         # Iterate through the names of the variables keeping the option values
         for var in [v for v in dir(all_options) if not v.startswith('_')]:
             # We get the related action from the argparser
-            action = None
-            for a in arg_parser._actions:
-                if a.dest == var and a.option_strings:
-                    action = a
-                    break
+            action = dest_index.get(var, None)
 
             if action:
                 # We chose as name the longest option name and we strip any leading '-'
@@ -190,6 +592,9 @@ class Program(object):
                 # variable name
                 variable_to_option_name[var] = var
 
+        # The configuration file discovery is reported on its own
+        self._phase_times["parse"] = time.time() - start - self._phase_times.get("config", 0.0)
+
         return all_options, variable_to_option_name
 
     def _logHeader(self):
@@ -269,22 +674,414 @@ class Program(object):
             else:
                 self._env[value] = joinPath(multiPathAppend(local_search_paths, SUFFIXES[name]))
 
+    def _logStartupReport(self, report):
+        self._logger.info("##########################################################")
+        self._logger.info("#")
+        self._logger.info("# Startup Profile")
+        self._logger.info("# ---------------------------")
+        self._logger.info("#")
+        for name, seconds in report["phases"].items():
+            self._logger.info("%s: %.6f s", name, seconds)
+        self._logger.info("#")
+        self._logger.info("# %10s %10s %10s  %s", "find [s]", "self [s]", "cumul. [s]", "module")
+        for r in report["imports"]:
+            self._logger.info("# %10.6f %10.6f %10.6f  %s",
+                              r["find"], r["self"], r["cumulative"], r["module"])
+        self._logger.info("#")
+
+    def _reportStartup(self, output_file):
+        """ Report the startup profile: the time of the startup phases and
+        the import time of the modules recorded by the launcher (sorted by
+        decreasing cumulative time).
+        :param output_file: name of the JSON report file. The report is
+            logged if empty.
+        """
+        from ElementsKernel.Profiling import stopImportTimer, writeReport
+        import_timer = stopImportTimer()
+        report = OrderedDict()
+        report["phases"] = OrderedDict(sorted(self._phase_times.items(),
+                                              key=lambda t: t[1], reverse=True))
+        report["imports"] = import_timer.getRecords() if import_timer else []
+        if not import_timer:
+            self._logger.warning("No import time recorded: the program has not been started by its launcher")
+        if output_file:
+            writeReport(report, output_file)
+            self._logger.info("Startup profile written to %s", output_file)
+        else:
+            self._logStartupReport(report)
+
+    def _setupCheckpoint(self, args, entry=None):
+        """ Configure the checkpoint of the program. It is only resumed for
+        the same values of the program specific options and the same shard.
+        :param entry: the (line number, arguments) pair of a batch entry.
+            Each entry has its own checkpoint, named after its line number
+            and only resumed for the same arguments.
+        """
+        checkpoint_dir = self._getGenericOption(args, "checkpoint_dir")
+        if not checkpoint_dir:
+            self._resetCheckpoint()
+            return
+        # the checkpoint module (and pickle) is only imported when it is used
+        import hashlib
+        from ElementsKernel import Checkpoint
+        options = sorted([(k, repr(v)) for k, v in vars(args).items() if k not in self._generic_dests])
+        if entry is not None:
+            options.append(("batch_entry", repr(entry[1])))
+        key = hashlib.sha1(repr(options).encode("utf-8")).hexdigest()
+        name = os.path.splitext(self._program_name or self._app_module.__name__)[0]
+        name = Sharding.getShardFileName(name)
+        if entry is not None:
+            name += ".line%d" % entry[0]
+        checkpoint = Checkpoint.configure(checkpoint_dir, name,
+                                          self._getGenericOption(args, "resume", False), key,
+                                          self._getGenericOption(args, "checkpoint_interval", 0.0))
+        self._logger.debug("Checkpoint file: %s", checkpoint.getFileName())
+
+    @staticmethod
+    def _resetCheckpoint():
+        """ Remove the checkpoint of a previous run, if the checkpoint
+        module has been imported """
+        checkpoint_module = sys.modules.get("ElementsKernel.Checkpoint")
+        if checkpoint_module is not None:
+            checkpoint_module.configure(None, "")
+
+    @staticmethod
+    def _flushCheckpoint():
+        """ Write the last progress of the checkpoint, which may have been
+        skipped because of the checkpoint interval """
+        checkpoint_module = sys.modules.get("ElementsKernel.Checkpoint")
+        checkpoint = checkpoint_module.getCheckpoint() if checkpoint_module else None
+        if checkpoint:
+            checkpoint.flush()
+
     def _setup(self):
 
+        start = time.time()
         self._bootStrapEnvironment()
+        self._phase_times["bootstrap"] = time.time() - start
 
         args, names = self._parseParameters()
+        self._metrics_file = self._getGenericOption(args, "metrics_file")
+        # the values may come from the configuration file
+        # it also removes the early thread limit if the program defines
+        # its own --num-threads option
+        thread_limit = Concurrency.configure(self._getGenericOption(args, "num_threads"),
+                                             self._getGenericOption(args, "num_processes"))
+        if thread_limit:
+            self._logger.debug("Thread limit of the native libraries: %d", thread_limit)
+        if self._getGenericOption(args, "batch_file"):
+            # each batch entry has its own checkpoint
+            self._resetCheckpoint()
+        else:
+            self._setupCheckpoint(args)
+        profile_startup_output = self._getGenericOption(args, "profile_startup_output")
+        if self._getGenericOption(args, "profile_startup") or profile_startup_output:
+            self._reportStartup(profile_startup_output)
+        elif "ElementsKernel.Profiling" in sys.modules:
+            # the import timer may have been started by the launcher
+            sys.modules["ElementsKernel.Profiling"].stopImportTimer()
         self._logHeader()
         self._logAllOptions(args, names)
         self._logTheEnvironment()
         return args, names
 
+    def _logPathStats(self):
+        stats = getStats()
+        if stats is None:
+            return
+        self._logger.debug("##########################################################")
+        self._logger.debug("#")
+        self._logger.debug("# File Lookup Statistics")
+        self._logger.debug("# ---------------------------")
+        self._logger.debug("#")
+        for name in sorted(stats):
+            value = stats[name]
+            if name == "location_hits":
+                for location in sorted(value):
+                    self._logger.debug("hits in %s: %d", location, value[location])
+            elif isinstance(value, dict):
+                self._logger.debug("%s: %d calls, %.6f s", name, value["calls"], value["seconds"])
+            else:
+                self._logger.debug("%s: %d", name, value)
+        self._logger.debug("#")
+
+    def _logPhaseTimes(self):
+        self._logger.debug("##########################################################")
+        self._logger.debug("#")
+        self._logger.debug("# Phase Timing")
+        self._logger.debug("# ---------------------------")
+        self._logger.debug("#")
+        for name, seconds in self._phase_times.items():
+            self._logger.debug("%s: %.6f s", name, seconds)
+        self._logger.debug("#")
+
+    def _getOutputFileName(self, extension):
+        """ Get the default name of a profiling output file """
+        return "%s.%d.%s" % (self._program_name or self._app_module.__name__,
+                             os.getpid(), extension)
+
+    def _startSamplingProfiler(self, args):
+        frequency = self._getGenericOption(args, "sample_profile")
+        if not frequency:
+            return
+        import signal
+        from ElementsKernel.Profiling import SamplingProfiler
+        output_file = self._getGenericOption(args, "sample_profile_output") or self._getOutputFileName("folded")
+        try:
+            self._sampling_profiler = SamplingProfiler(frequency, output_file,
+                                                       dump_signal=signal.SIGUSR1)
+            self._sampling_profiler.start()
+        except (ValueError, AttributeError) as e:
+            # wrong frequency, not the main thread or no interval timer
+            self._logger.warning("The sampling profiler cannot be started: %s", e)
+            self._sampling_profiler = None
+            return
+        self._logger.info("Sampling the stacks at %g Hz into %s", frequency, output_file)
+
+    def _startMemoryTracer(self, args):
+        frames = self._getGenericOption(args, "trace_memory_frames")
+        if not self._getGenericOption(args, "trace_memory") and not frames:
+            return
+        import signal
+        from ElementsKernel.Profiling import MemoryTracer
+        try:
+            self._memory_tracer = MemoryTracer(frames or 1,
+                                               self._getGenericOption(args, "trace_memory_interval"),
+                                               snapshot_signal=signal.SIGUSR2)
+            self._memory_tracer.start()
+        except ValueError as e:
+            self._logger.warning("The memory allocations cannot be traced: %s", e)
+            self._memory_tracer = None
+
+    def _stopMemoryTracer(self):
+        if self._memory_tracer is None:
+            return
+        self._memory_tracer.stop()
+        self._logger.info("##########################################################")
+        self._logger.info("#")
+        self._logger.info("# Memory Allocations")
+        self._logger.info("# ---------------------------")
+        self._logger.info("#")
+        for line in self._memory_tracer.getReport():
+            self._logger.info(line)
+        self._logger.info("#")
+        self._memory_tracer = None
+
+    def _stopSamplingProfiler(self):
+        if self._sampling_profiler is None:
+            return
+        self._sampling_profiler.stop()
+        output_file = self._sampling_profiler.write()
+        self._logger.info("%d stack samples written to %s",
+                          self._sampling_profiler.getSampleCount(), output_file)
+        self._sampling_profiler = None
+
+    def _logResourceUsage(self):
+        if not self._metrics_file and not self._logger.isEnabledFor(logging.DEBUG):
+            return None
+        from ElementsKernel.Profiling import getResourceUsage
+        try:
+            resources = getResourceUsage()
+        except ImportError:
+            # no resource module on this platform
+            return None
+        for who in ("self", "children"):
+            usage = resources[who]
+            self._logger.debug("# Resources (%s): max RSS %d kB, CPU user %.3f s, system %.3f s, "
+                               "context switches %d voluntary, %d involuntary",
+                               who, usage["max_rss_bytes"] // 1024,
+                               usage["user_cpu_seconds"], usage["system_cpu_seconds"],
+                               usage["voluntary_context_switches"],
+                               usage["involuntary_context_switches"])
+        if "io" in resources:
+            self._logger.debug("# Resources (io): %d bytes read, %d bytes written",
+                               resources["io"].get("read_bytes", 0),
+                               resources["io"].get("written_bytes", 0))
+        return resources
+
+    def _writeMetrics(self, exit_code, resources):
+        metrics = OrderedDict()
+        metrics["program"] = self._program_name
+        metrics["exit_code"] = exit_code
+        metrics["phases"] = self._phase_times
+        metrics["resources"] = resources
+        from ElementsKernel.Profiling import writeReport
+        try:
+            writeReport(metrics, self._metrics_file)
+        except (IOError, OSError) as e:
+            self._logger.warning("The metrics file %s cannot be written: %s", self._metrics_file, e)
+
     def _tearDown(self, exit_code):
 
+        start = time.time()
+        self._stopSamplingProfiler()
+        self._stopMemoryTracer()
+        self._logPathStats()
+        self._phase_times["teardown"] = time.time() - start
+        self._logPhaseTimes()
         if exit_code is not None:
             self._logger.debug("# Exit Code: %d", exit_code)
+        resources = self._logResourceUsage()
+        if self._metrics_file:
+            self._writeMetrics(exit_code, resources)
         self._logFooter()
 
+    def _cancelPendingTasks(self, loop):
+        """ Cancel the tasks still pending at the end of the main method
+        coroutine and wait for their completion """
+        import asyncio
+        tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+        if not tasks:
+            return
+        self._logger.warning("Cancelling %d pending task(s) of the event loop", len(tasks))
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                self._logger.error("Exception in a pending task: %s", task.exception())
+
+    def _runCoroutine(self, args):
+        """ Run the main method coroutine in an event loop owned by the
+        program. The pending tasks, the asynchronous generators and the
+        default executor are shut down before the loop is closed.
+        """
+        import asyncio
+        loop_policy = self._getGenericOption(args, "event_loop_policy")
+        if loop_policy:
+            asyncio.set_event_loop_policy(_getLoopPolicy(loop_policy)())
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            executor_workers = self._getGenericOption(args, "executor_workers")
+            if executor_workers:
+                from concurrent.futures import ThreadPoolExecutor
+                loop.set_default_executor(ThreadPoolExecutor(executor_workers))
+            return loop.run_until_complete(self._app_module.mainMethod(args))
+        finally:
+            try:
+                self._cancelPendingTasks(loop)
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                if hasattr(loop, "shutdown_default_executor"):
+                    loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+
+    def _callMainMethod(self, args):
+        """ Call the main method of the program, running it in an event
+        loop if it is a coroutine function
+        :return: the exit code of the main method
+        """
+        if self._has_pipeline_input:
+            args.pipeline_input = self._pipeline_input
+        self._result = None
+        if isCoroutineFunction(self._app_module.mainMethod):
+            exit_code = self._runCoroutine(args)
+        else:
+            exit_code = self._app_module.mainMethod(args)
+        if self._has_pipeline_input and exit_code is not None and not isinstance(exit_code, int):
+            # the main method of a pipeline step returned an object for the
+            # next step instead of an exit code
+            self._result = exit_code
+            exit_code = Exit.Code["OK"]
+        return exit_code
+
+    def _runBatchEntry(self, entry):
+        """ Parse the arguments of a batch entry and run the main method
+        :param entry: the (line number, arguments) pair of the entry
+        :return: the exit code of the entry. Its result is available with
+            getResult.
+        """
+        line_no, tokens = entry
+        self._result = None
+        try:
+            args = self._arg_parser.parse_args(self._base_options + tokens)
+        except SystemExit:
+            self._logger.error("Wrong arguments in the batch entry at line %d: %s", line_no, tokens)
+            return Exit.Code["USAGE"]
+        self._logger.debug("Batch entry at line %d: %s", line_no, tokens)
+        program_shard = Sharding.getShard()
+        try:
+            # the entry may have its own shard
+            Sharding.configure(self._getGenericOption(args, "shard_index"),
+                               self._getGenericOption(args, "shard_count"))
+        except ValueError as e:
+            self._logger.error("Wrong shard in the batch entry at line %d: %s", line_no, e)
+            return Exit.Code["USAGE"]
+        try:
+            self._setupCheckpoint(args, entry)
+            try:
+                exit_code = self._callMainMethod(args)
+            finally:
+                self._flushCheckpoint()
+        except Exception:
+            self._logger.exception(sys.exc_info()[1])
+            exit_code = Exit.Code["NOT_OK"]
+        finally:
+            self._resetCheckpoint()
+            Sharding.configure(*program_shard)
+        if exit_code is None:
+            exit_code = Exit.Code["OK"]
+        return exit_code
+
+    def _runBatch(self, args):
+        """ Run the main method for all the entries of the batch file
+        :return: OK if all the entries succeeded
+        """
+        global _batch_program
+        batch_file = self._getGenericOption(args, "batch_file")
+        entries = readBatchFile(batch_file)
+        workers = min(self._getGenericOption(args, "batch_workers", 1), len(entries))
+        pool = None
+        if workers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            try:
+                # the workers inherit the program and the parser
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+            except ValueError:
+                self._logger.warning("No fork start method: the batch entries are run sequentially")
+        self._logger.info("Running %d batch entries from %s with %d worker(s)",
+                          len(entries), batch_file, workers if pool else 1)
+        if pool:
+            _batch_program = self
+            try:
+                with pool:
+                    outcomes = list(pool.map(_runBatchEntry, entries))
+            finally:
+                _batch_program = None
+        else:
+            outcomes = []
+            for entry in entries:
+                exit_code = self._runBatchEntry(entry)
+                outcomes.append((exit_code, self._result))
+        # the result of the batch is the list of the results of the entries
+        self._result = [r for _, r in outcomes]
+        failed = [(e[0], c) for e, (c, _) in zip(entries, outcomes) if c != Exit.Code["OK"]]
+        for line_no, exit_code in failed:
+            self._logger.error("The batch entry at line %d failed with the exit code %s", line_no, exit_code)
+        self._logger.info("%d of %d batch entries succeeded", len(entries) - len(failed), len(entries))
+        if failed:
+            return Exit.Code["NOT_OK"]
+        return Exit.Code["OK"]
+
+    def setPipelineInput(self, value):
+        """ Set the object handed to the main method as the pipeline_input
+        attribute of its arguments (e.g. the result of the previous step of
+        a pipeline). Without a call to this method, the arguments are left
+        untouched.
+        """
+        self._pipeline_input = value
+        self._has_pipeline_input = True
+
+    def getResult(self):
+        """ Get the object returned by the main method of a pipeline step
+        when it is not an exit code. None otherwise. Out of a pipeline, such
+        an object is the exit code of the program.
+        """
+        return self._result
+
     def getProgramName(self):
         return self._program_name
 
@@ -293,10 +1090,26 @@ class Program(object):
         args, _ = self._setup()
 
         exit_code = Exit.Code["NOT_OK"]
+        self._startSamplingProfiler(args)
+        self._startMemoryTracer(args)
+        start = time.time()
+        main_method = self._callMainMethod
+        if self._getGenericOption(args, "batch_file"):
+            main_method = self._runBatch
         try:
-            exit_code = self._app_module.mainMethod(args)
+            profile_output = self._getGenericOption(args, "profile_output")
+            if self._getGenericOption(args, "profile") or profile_output:
+                profile_output = profile_output or self._getOutputFileName("prof")
+                self._logger.info("Profiling the main method into %s", profile_output)
+                from ElementsKernel.Profiling import runProfiled
+                exit_code = runProfiled(profile_output, main_method, args)
+            else:
+                exit_code = main_method(args)
         except Exception:
             self._logger.exception(sys.exc_info()[1])
+        Concurrency.shutdownExecutor()
+        self._flushCheckpoint()
+        self._phase_times["main"] = time.time() - start
 
         self._tearDown(exit_code)
 
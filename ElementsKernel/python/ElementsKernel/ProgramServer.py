@@ -0,0 +1,336 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+Warm worker server of the Elements python programs.
+
+The server is a long-lived process which has already imported
+ElementsKernel and the application module. It listens on a Unix socket
+and forks a child per request. The child takes the command line, the
+environment, the current directory and the standard streams of the client
+and runs Program.runProgram. The exit code is sent back to the client.
+
+The generated launchers start the server when the ELEMENTS_PROGRAM_SERVER
+environment variable is set to "serve", and act as thin clients when it is
+set to "client". The client only connects to a socket owned by the user
+and private, in a private directory: otherwise the program is run
+locally. Like this module, the client part only depends on the standard
+library.
+'''
+
+import os
+import sys
+import json
+import array
+import socket
+import struct
+import stat
+import signal
+
+SERVER_VAR = "ELEMENTS_PROGRAM_SERVER"
+
+SERVE_MODE = "serve"
+
+CLIENT_MODE = "client"
+
+_INT_FORMAT = "!i"
+
+_INT_SIZE = struct.calcsize(_INT_FORMAT)
+
+_STDIO_FDS = (0, 1, 2)
+
+
+def getSocketPath(program_name):
+    """ Get the path of the Unix socket of the server of a program. It is
+    located in $XDG_RUNTIME_DIR if defined, or in a per-user directory of
+    the temporary directory.
+    :param program_name: name of the program (executable)
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", None)
+    if runtime_dir:
+        server_dir = os.path.join(runtime_dir, "Elements")
+    else:
+        import tempfile
+        server_dir = os.path.join(tempfile.gettempdir(), "Elements-%d" % os.getuid())
+    return os.path.join(server_dir, program_name + ".sock")
+
+
+def isClientEnabled():
+    """ Check if the launcher may send its request to a server """
+    return os.environ.get(SERVER_VAR, "") == CLIENT_MODE
+
+
+def isServerMode():
+    """ Check if the launcher has to start the server """
+    return os.environ.get(SERVER_VAR, "") == SERVE_MODE
+
+
+def _isPrivate(path, mode, check_type):
+    """ Check that a path is owned by the user and has the given
+    permissions. Symbolic links are not followed.
+    :param mode: the expected permission bits
+    :param check_type: stat function checking the file type (e.g. stat.S_ISDIR)
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (check_type(st.st_mode) and st.st_uid == os.getuid()
+            and stat.S_IMODE(st.st_mode) == mode)
+
+
+def isPrivateSocketPath(socket_path):
+    """ Check that the socket and its directory are owned by the user and
+    only accessible by the user (modes 0600 and 0700). Another user could
+    otherwise collect the requests (environment and standard streams).
+    """
+    return (_isPrivate(os.path.dirname(socket_path), 0o700, stat.S_ISDIR)
+            and _isPrivate(socket_path, 0o600, stat.S_ISSOCK))
+
+
+def _recvExactly(sock, size):
+    """ Receive exactly size bytes. None if the connection is closed before """
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recvInt(sock):
+    data = _recvExactly(sock, _INT_SIZE)
+    if data is None:
+        return None
+    return struct.unpack(_INT_FORMAT, data)[0]
+
+
+def runClient(socket_path, argv=None):
+    """ Send the request of the current process to the server and wait for
+    its completion. The standard streams of the process are passed to the
+    server. SIGINT, SIGTERM and SIGHUP are forwarded to the process
+    running the request.
+    :param socket_path: path to the socket of the server
+    :param argv: command line of the request. sys.argv by default.
+    :return: the exit code of the request. None if the server is not
+        reachable or if its socket is not private: the program has then to
+        be run locally.
+    """
+    if argv is None:
+        argv = sys.argv
+    if not os.path.exists(socket_path):
+        return None
+    if not isPrivateSocketPath(socket_path):
+        sys.stderr.write("Warning: the server socket %s or its directory is not private to the user: "
+                         "it is not used\n" % socket_path)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except (IOError, OSError):
+        sock.close()
+        return None
+
+    with sock:
+        request = json.dumps({"argv": list(argv),
+                              "env": dict(os.environ),
+                              "cwd": os.getcwd()}).encode("utf-8")
+        try:
+            # the standard streams are sent with the size of the request
+            sock.sendmsg([struct.pack(_INT_FORMAT, len(request))],
+                         [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", _STDIO_FDS))])
+            sock.sendall(request)
+            worker_pid = _recvInt(sock)
+        except (IOError, OSError):
+            worker_pid = None
+        if worker_pid is None:
+            # the request has not been accepted
+            return None
+
+        def forward(signum, _):
+            try:
+                os.kill(worker_pid, signum)
+            except OSError:
+                pass
+
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, forward)
+
+        exit_code = _recvInt(sock)
+
+    if exit_code is None:
+        # the worker died without reporting
+        return 1
+    return exit_code
+
+
+def _receiveRequest(conn):
+    """ Receive the standard streams and the request of a client """
+    fds = array.array("i")
+    header, ancdata, _, _ = conn.recvmsg(_INT_SIZE, socket.CMSG_LEN(len(_STDIO_FDS) * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    if len(header) < _INT_SIZE or len(fds) != len(_STDIO_FDS):
+        for fd in fds:
+            os.close(fd)
+        return None, None
+    header += _recvExactly(conn, _INT_SIZE - len(header)) or b""
+    body = _recvExactly(conn, struct.unpack(_INT_FORMAT, header)[0])
+    if body is None:
+        return None, None
+    return json.loads(body.decode("utf-8")), list(fds)
+
+
+def _getExitStatus(code):
+    """ Get the exit status of a request like the python interpreter does for
+    sys.exit: None is a success and any other non-integer code is written to
+    the standard error stream and is a failure.
+    :param code: the value returned by runProgram or the SystemExit code
+    """
+    from ElementsKernel import Exit
+    if code is None:
+        return Exit.Code["OK"]
+    if isinstance(code, int):
+        return code
+    sys.stderr.write("%s\n" % code)
+    return 1
+
+
+def _runRequest(program, conn, listener):
+    """ Run a request in the forked child. Never returns. """
+    exit_code = 1
+    try:
+        listener.close()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        request, fds = _receiveRequest(conn)
+        if request is None:
+            os._exit(exit_code)
+        conn.sendall(struct.pack(_INT_FORMAT, os.getpid()))
+
+        for target_fd, fd in zip(_STDIO_FDS, fds):
+            os.dup2(fd, target_fd)
+            os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = request["argv"]
+        # the children must not share the random state of the server
+        import random
+        random.seed()
+
+        exit_code = _getExitStatus(program.runProgram())
+    except SystemExit as e:
+        # e.g. --help or wrong options
+        exit_code = _getExitStatus(e.code)
+    except BaseException:  # pylint: disable=broad-except
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(struct.pack(_INT_FORMAT, exit_code))
+        except BaseException:  # pylint: disable=broad-except
+            pass
+        os._exit(exit_code)
+
+
+def _reapChildren():
+    """ Collect the terminated children """
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except OSError:
+            return
+        if pid == 0:
+            return
+
+
+def _prepareSocketPath(socket_path):
+    """ Create the socket directory and remove a stale socket
+    :return: an error message, None if the socket can be created
+    """
+    server_dir = os.path.dirname(socket_path)
+    if not os.path.lexists(server_dir):
+        os.makedirs(server_dir, 0o700)
+        os.chmod(server_dir, 0o700)
+    if not _isPrivate(server_dir, 0o700, stat.S_ISDIR):
+        return "The directory %s is not owned by the user with the 0700 mode" % server_dir
+    if os.path.lexists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            return "A server is already listening on %s" % socket_path
+        except (IOError, OSError):
+            os.remove(socket_path)
+        finally:
+            probe.close()
+    return None
+
+
+def serveProgram(program, socket_path):
+    """ Run the server of a program until SIGTERM or SIGINT
+    :param program: the ElementsKernel.Program.Program instance
+    :param socket_path: path to the Unix socket of the server
+    :return: the exit code of the server
+    """
+    from ElementsKernel import Logging
+    from ElementsKernel import Exit
+    logger = Logging.getLogger("ElementsProgramServer")
+
+    error = _prepareSocketPath(socket_path)
+    if error:
+        logger.error(error)
+        return Exit.Code["NOT_OK"]
+
+    def stop(*_):
+        raise SystemExit(Exit.Code["OK"])
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGCHLD, lambda *_: _reapChildren())
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        listener.listen(64)
+        logger.info("Serving %s on %s (pid %d)", program.getProgramName(), socket_path, os.getpid())
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except InterruptedError:
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                _runRequest(program, conn, listener)
+            conn.close()
+    except SystemExit as e:
+        logger.info("Stopping the server on %s", socket_path)
+        return e.code
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
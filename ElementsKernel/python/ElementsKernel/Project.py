@@ -160,13 +160,13 @@ def createProject(project_dir, proj_name, proj_version, dep_projects, standalone
 
     configuration = getSubstituteConfiguration(proj_name, proj_version, dep_projects, standalone, visibility)
 
+    jobs = []
     for src in target_locations:
         file_name = os.path.join("ElementsKernel", "templates", src)
         tgt = target_locations[src]
-        Auxiliary.configure(file_name, project_dir, tgt,
-                            configuration=configuration,
-                            create_missing_dir=True)
+        jobs.append((file_name, os.path.join(project_dir, tgt), configuration))
         ProjectCommonRoutines.addItemToCreationList(os.path.join(project_dir, tgt))
+    Auxiliary.configureFiles(jobs, create_missing_dir=True)
 
 
 def makeChecks(proj_name, proj_version, dependency, dependant_projects):
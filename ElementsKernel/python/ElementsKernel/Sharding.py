@@ -0,0 +1,120 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Created on Oct 18, 2026
+
+Partitioning of the work of a program between shards (e.g. the jobs of a
+batch array). The shard of the program is set by the --shard-index and
+--shard-count generic options. The partitions are contiguous and balanced:
+their sizes differ by one item at most, and they only depend on the
+inputs, the shard index and the shard count.
+'''
+
+import os
+import glob
+
+_shard_index = 0
+_shard_count = 1
+
+
+def _checkShard(shard_index, shard_count):
+    """ Raise a ValueError if the shard index or count is out of range """
+    if shard_count < 1:
+        raise ValueError("The shard count must be positive: %d" % shard_count)
+    if not 0 <= shard_index < shard_count:
+        raise ValueError("The shard index must be between 0 and %d: %d" % (shard_count - 1, shard_index))
+
+
+def configure(shard_index=None, shard_count=None):
+    """ Set the shard of the program
+    :param shard_index: index of the shard, from 0 to shard_count - 1.
+        0 if None.
+    :param shard_count: number of shards. 1 if None.
+    """
+    global _shard_index, _shard_count
+    if shard_index is None:
+        shard_index = 0
+    if shard_count is None:
+        shard_count = 1
+    _checkShard(shard_index, shard_count)
+    _shard_index = shard_index
+    _shard_count = shard_count
+
+
+def getShard():
+    """ Get the (index, count) of the shard of the program """
+    return _shard_index, _shard_count
+
+
+def _getBounds(size, shard_index, shard_count):
+    """ Get the [start, end) bounds of the partition of a shard """
+    if shard_index is None:
+        shard_index = _shard_index
+    if shard_count is None:
+        shard_count = _shard_count
+    _checkShard(shard_index, shard_count)
+    return (size * shard_index) // shard_count, (size * (shard_index + 1)) // shard_count
+
+
+def partition(items, shard_index=None, shard_count=None):
+    """ Get the items of a shard. The order of the items is kept.
+    :param items: sequence of items. It must be the same for all the shards.
+    :param shard_index: index of the shard. The one of the program by default.
+    :param shard_count: number of shards. The one of the program by default.
+    :return: the list of the items of the shard
+    """
+    items = list(items)
+    start, end = _getBounds(len(items), shard_index, shard_count)
+    return items[start:end]
+
+
+def partitionRange(start, stop=None, shard_index=None, shard_count=None):
+    """ Get the integers of a shard, like the range builtin:
+    partitionRange(stop) or partitionRange(start, stop)
+    :return: the range of the shard
+    """
+    if stop is None:
+        start, stop = 0, start
+    size = max(0, stop - start)
+    first, last = _getBounds(size, shard_index, shard_count)
+    return range(start + first, start + last)
+
+
+def partitionGlob(pattern, shard_index=None, shard_count=None):
+    """ Get the files matching a pattern for a shard. The files are sorted
+    to have the same partitions on all the hosts.
+    :param pattern: glob pattern
+    :return: the sorted list of the files of the shard
+    """
+    return partition(sorted(glob.glob(pattern)), shard_index, shard_count)
+
+
+def getShardFileName(file_name, shard_index=None, shard_count=None):
+    """ Get a file name specific to a shard: "run.log" becomes
+    "run.shard3.log" for the shard 3. The name is unchanged if there is
+    only one shard.
+    """
+    if shard_index is None:
+        shard_index = _shard_index
+    if shard_count is None:
+        shard_count = _shard_count
+    if shard_count <= 1:
+        return file_name
+    base, ext = os.path.splitext(file_name)
+    return "%s.shard%d%s" % (base, shard_index, ext)
@@ -27,6 +27,7 @@ from shutil import rmtree
 import os
 import tempfile
 import sys
+import types
 
 from ElementsKernel import Logging
 
@@ -325,3 +326,47 @@ class Environment(object):
 
 
 TempEnv = Environment
+
+
+class TempModule(object):
+
+    """
+    Class to register a module temporarily in sys.modules (e.g. a program
+    module defined by a test).
+    """
+
+    def __init__(self, name, **attributes):
+        """
+        Create the module with the given attributes and register it.
+        """
+        self.module = types.ModuleType(name)
+        for key, value in attributes.items():
+            setattr(self.module, key, value)
+        sys.modules[name] = self.module
+
+    def getName(self):
+        """Returns the name of the module"""
+        return self.module.__name__
+
+    def remove(self):
+        """
+        Unregister the module if it is still the registered one.
+        """
+        if sys.modules.get(self.module.__name__, None) is self.module:
+            del sys.modules[self.module.__name__]
+
+    def __del__(self):
+        """
+        Unregister the module on destruction.
+        """
+        self.remove()
+
+    def __enter__(self):
+        """ To work with the context"""
+        return self
+
+    def __exit__(self, *_):
+        """
+        Unregister the module on the end of the context.
+        """
+        self.remove()
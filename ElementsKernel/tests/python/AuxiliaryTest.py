@@ -25,9 +25,17 @@
 
 import os
 import unittest
+import zipfile
 
 from ElementsKernel.Temporary import TempDir, TempEnv
-from ElementsKernel.Auxiliary import configure, getAuxiliaryPath
+from ElementsKernel.Auxiliary import configure, getAuxiliaryPath, getAuxiliaryPaths
+from ElementsKernel.Auxiliary import openAuxiliary, setAuxiliaryCacheSize, clearAuxiliaryCache
+from ElementsKernel.Auxiliary import DEFAULT_MAP_CACHE_SIZE, configureFiles
+from ElementsKernel.Auxiliary import clearTemplateCache, _template_cache
+from ElementsKernel.Path import getAllPaths, getLocations
+from ElementsKernel.Path import enableNegativeCache, disableNegativeCache, invalidateNegativeCache
+from ElementsKernel.Path import getNegativeCache
+from ElementsKernel.Path import NegativeCache
 
 
 class AuxiliaryTest(unittest.TestCase):
@@ -88,6 +96,7 @@ class AuxiliaryTest(unittest.TestCase):
 
     def tearDown(self):
         unittest.TestCase.tearDown(self)
+        clearTemplateCache()
         del self._tmpenv
         del self._tmpdir
 
@@ -103,6 +112,72 @@ class AuxiliaryTest(unittest.TestCase):
         self.assertEqual(getAuxiliaryPath("tata/tutu/file2"),
                          os.path.join(self._tmpdir.path(), "tata", "tutu", "file2"))
 
+    def testAuxPathsEnv(self):
+        self.assertEqual(getAuxiliaryPaths(["file1", "tata/tutu/file2", "missing"], False),
+                         [os.path.join(self._tmpdir.path(), "file1"),
+                          os.path.join(self._tmpdir.path(), "tata", "tutu", "file2"),
+                          None])
+        self.assertRaises(Exception, getAuxiliaryPaths, ["file1", "missing"])
+        self.assertEqual(getAllPaths(["tata/file1", "missing"], "auxiliary"),
+                         [[os.path.join(self._tmpdir.path(), "tata", "file1")], []])
+
+    def testNegativeCache(self):
+        cache_file = os.path.join(self._tmpdir.path(), "cache", "negative.json")
+        enableNegativeCache(ttl=100.0, persistent=True, file_path=cache_file)
+        try:
+            self.assertEqual(getAuxiliaryPath("late_file", False), None)
+            AuxiliaryTest.TestFile(os.path.join(self._tmpdir.path(), "late_file"), "content")
+            # the miss is remembered
+            self.assertEqual(getAuxiliaryPaths(["late_file"], False), [None])
+            # the cache file is only written at exit
+            self.assertFalse(os.path.exists(cache_file))
+            getNegativeCache().save()
+            self.assertTrue(NegativeCache(file_path=cache_file).isMissing("auxiliary", "late_file",
+                                                                           getLocations("auxiliary")))
+            # the entries of another process are kept
+            other_cache = NegativeCache(file_path=cache_file)
+            other_cache.addMissing("configuration", "other_file", ["/other"])
+            other_cache.save()
+            invalidateNegativeCache("auxiliary")
+            self.assertEqual(getAuxiliaryPath("late_file"), os.path.join(self._tmpdir.path(), "late_file"))
+            self.assertTrue(NegativeCache(file_path=cache_file).isMissing("configuration", "other_file",
+                                                                           ["/other"]))
+            invalidateNegativeCache()
+            self.assertFalse(os.path.exists(cache_file))
+        finally:
+            disableNegativeCache()
+
+    def testArchiveLocation(self):
+        archive_path = os.path.join(self._exiting_dir, "aux.zip")
+        with zipfile.ZipFile(archive_path, "w") as z:
+            z.writestr("Mod/zipped_file", "Zipped content %(bla)s")
+        self._tmpenv["ELEMENTS_AUX_PATH"] = archive_path + os.pathsep + self._tmpdir.path()
+
+        self.assertEqual(getAuxiliaryPath("Mod/zipped_file"), os.path.join(archive_path, "Mod", "zipped_file"))
+        self.assertEqual(getAuxiliaryPath("Mod"), os.path.join(archive_path, "Mod"))
+        self.assertEqual(getAuxiliaryPath("tata/file1"), os.path.join(self._tmpdir.path(), "tata", "file1"))
+
+        configure("Mod/zipped_file", self._exiting_dir, configuration={"bla": "foo"})
+        target_file = os.path.join(self._exiting_dir, "zipped_file")
+        self.assertEqual(open(target_file).read(), "Zipped content foo")
+        configure("Mod/zipped_file", self._exiting_dir, target_name="raw_file")
+        target_file = os.path.join(self._exiting_dir, "raw_file")
+        self.assertEqual(open(target_file).read(), "Zipped content %(bla)s")
+
+    def testOpenAuxiliary(self):
+        setAuxiliaryCacheSize(1)
+        try:
+            data = openAuxiliary("tata/file1")
+            self.assertEqual(data[:], b"This content no replacement")
+            # the map is shared
+            self.assertTrue(openAuxiliary("tata/file1") is data)
+            openAuxiliary("file1")
+            self.assertFalse(openAuxiliary("tata/file1") is data)
+            self.assertRaises(ValueError, openAuxiliary, "file1", "w")
+        finally:
+            setAuxiliaryCacheSize(DEFAULT_MAP_CACHE_SIZE)
+            clearAuxiliaryCache()
+
     def testConfigure(self):
         configure("file1", self._exiting_dir)
         self.assertTrue(os.path.exists(os.path.join(self._exiting_dir, "file1")))
@@ -110,6 +185,48 @@ class AuxiliaryTest(unittest.TestCase):
         target_file = os.path.join(self._exiting_dir, "file2")
         self.assertTrue(os.path.exists(target_file))
         self.assertEqual(open(target_file).read(), "That content foo bar")
+        # the change of the template is followed
+        self._test_files[3].setContent("That new content %(bla)s")
+        configure("file2", self._exiting_dir, configuration={"bla":"foo"})
+        self.assertEqual(open(target_file).read(), "That new content foo")
+
+    def testConfigureFiles(self):
+        target_1 = os.path.join(self._exiting_dir, "sub", "file1")
+        target_2 = os.path.join(self._exiting_dir, "file2")
+        jobs = [("tata/file1", target_1, None),
+                ("file2", target_2, {"bla": "foo", "blu": "bar"})]
+        self.assertEqual(configureFiles(jobs, create_missing_dir=True), [target_1, target_2])
+        self.assertEqual(open(target_1).read(), "This content no replacement")
+        self.assertEqual(open(target_2).read(), "That content foo bar")
+
+        # the unchanged targets are not rewritten
+        self.assertEqual(configureFiles(jobs), [])
+        jobs[1] = ("file2", target_2, {"bla": "foo", "blu": "baz"})
+        self.assertEqual(configureFiles(jobs), [target_2])
+        self.assertEqual(open(target_2).read(), "That content foo baz")
+        # only the substituted templates are cached
+        self.assertEqual(list(_template_cache.keys()), [os.path.join(self._tmpdir.path(), "file2")])
+
+    def testConfigureCopy(self):
+        binary_path = os.path.join(self._tmpdir.path(), "binary_file")
+        content = bytes(range(256)) * 1024
+        with open(binary_path, "wb") as f:
+            f.write(content)
+        os.chmod(binary_path, 0o750)
+        target_path = os.path.join(self._exiting_dir, "binary_file")
+        jobs = [("binary_file", target_path, None)]
+        self.assertEqual(configureFiles(jobs), [target_path])
+        with open(target_path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(os.stat(target_path).st_mode & 0o777, 0o750)
+        self.assertEqual(configureFiles(jobs), [])
+        # same size, different content
+        with open(binary_path, "wb") as f:
+            f.write(content[::-1])
+        self.assertEqual(configureFiles(jobs), [target_path])
+        with open(target_path, "rb") as f:
+            self.assertEqual(f.read(), content[::-1])
+        self.assertEqual(len(_template_cache), 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import sys
+import types
+import unittest
+
+from ElementsKernel.Temporary import TempDir
+from ElementsKernel import Checkpoint
+
+
+class CheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="checkpoint_tempdir")
+        self._file_name = os.path.join(self._tmpdir.path(), "work.checkpoint")
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        Checkpoint.configure(None, "work")
+
+    def testResume(self):
+        checkpoint = Checkpoint.Checkpoint(self._file_name, key="options")
+        self.assertFalse(checkpoint.isResumed())
+        self.assertEqual(checkpoint.getState(0), 0)
+        self.assertTrue(checkpoint.save(4, {"total": 6}))
+        self.assertFalse(checkpoint.isResumed())
+        # no temporary file is left
+        self.assertEqual(os.listdir(self._tmpdir.path()), ["work.checkpoint"])
+
+        resumed = Checkpoint.Checkpoint(self._file_name, resume=True, key="options")
+        self.assertTrue(resumed.isResumed())
+        self.assertEqual(resumed.getCursor(), 4)
+        self.assertEqual(resumed.getState(), {"total": 6})
+        self.assertEqual(list(resumed.iterate("abcdef")), [(4, "e"), (5, "f")])
+
+    def testNoResume(self):
+        Checkpoint.Checkpoint(self._file_name, key="options").save(4, 6)
+        # other work
+        other = Checkpoint.Checkpoint(self._file_name, resume=True, key="other options")
+        self.assertFalse(other.isResumed())
+        self.assertEqual(list(other.iterate("ab")), [(0, "a"), (1, "b")])
+        # restart from zero
+        restart = Checkpoint.Checkpoint(self._file_name, key="options")
+        self.assertEqual(restart.getCursor(0), 0)
+        # missing checkpoint
+        missing = Checkpoint.Checkpoint(self._file_name + ".missing", resume=True)
+        self.assertFalse(missing.isResumed())
+
+    def testCorruptedCheckpoint(self):
+        with open(self._file_name, "wb") as f:
+            f.write(b"\x80\x04\x95")
+        checkpoint = Checkpoint.Checkpoint(self._file_name, resume=True)
+        self.assertFalse(checkpoint.isResumed())
+        self.assertEqual(checkpoint.getCursor(0), 0)
+        # the module or the class of the state are not available anymore
+        state_module = types.ModuleType("CheckpointTestState")
+        state_module.State = type("State", (object,), {"__module__": state_module.__name__})
+        sys.modules[state_module.__name__] = state_module
+        try:
+            Checkpoint.Checkpoint(self._file_name).save(2, state_module.State())
+            del state_module.State
+            self.assertFalse(Checkpoint.Checkpoint(self._file_name, resume=True).isResumed())
+        finally:
+            del sys.modules[state_module.__name__]
+        self.assertFalse(Checkpoint.Checkpoint(self._file_name, resume=True).isResumed())
+
+    def testInterval(self):
+        checkpoint = Checkpoint.Checkpoint(self._file_name, interval=3600.0)
+        self.assertTrue(checkpoint.save(1, "a"))
+        self.assertFalse(checkpoint.save(2, "b"))
+        self.assertEqual(Checkpoint.Checkpoint(self._file_name, resume=True).getCursor(), 1)
+        checkpoint.flush()
+        resumed = Checkpoint.Checkpoint(self._file_name, resume=True)
+        self.assertEqual((resumed.getCursor(), resumed.getState()), (2, "b"))
+
+    def testClear(self):
+        checkpoint = Checkpoint.Checkpoint(self._file_name)
+        checkpoint.save(1)
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self._file_name))
+        self.assertEqual(checkpoint.getCursor(0), 0)
+        checkpoint.flush()
+        self.assertFalse(os.path.exists(self._file_name))
+
+    def testConfigure(self):
+        self.assertEqual(Checkpoint.configure(None, "work"), None)
+        self.assertEqual(Checkpoint.getCheckpoint(), None)
+        checkpoint = Checkpoint.configure(os.path.join(self._tmpdir.path(), "sub"), "work")
+        self.assertTrue(Checkpoint.getCheckpoint() is checkpoint)
+        checkpoint.save(1)
+        self.assertTrue(os.path.exists(os.path.join(self._tmpdir.path(), "sub",
+                                                    "work" + Checkpoint.CHECKPOINT_SUFFIX)))
+
+
+if __name__ == '__main__':
+    unittest.main()
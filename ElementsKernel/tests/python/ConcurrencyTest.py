@@ -0,0 +1,76 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from ElementsKernel.Temporary import TempEnv
+from ElementsKernel import Concurrency
+
+
+class ConcurrencyTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpenv = TempEnv()
+        # record the variables to have them restored
+        for var in Concurrency.THREAD_LIMIT_VARS:
+            self._tmpenv[var] = "0"
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        Concurrency.configure()
+        del self._tmpenv
+
+    def testThreads(self):
+        self.assertEqual(Concurrency.configure(num_threads=3), 3)
+        for var in Concurrency.THREAD_LIMIT_VARS:
+            self.assertEqual(os.environ[var], "3")
+        self.assertEqual(Concurrency.getNumThreads(), 3)
+        executor = Concurrency.getExecutor()
+        self.assertTrue(isinstance(executor, ThreadPoolExecutor))
+        self.assertTrue(Concurrency.getExecutor() is executor)
+        self.assertEqual(list(executor.map(abs, [-1, -2])), [1, 2])
+        Concurrency.shutdownExecutor()
+        self.assertFalse(Concurrency.getExecutor() is executor)
+
+    def testProcesses(self):
+        limit = Concurrency.configure(num_processes=2)
+        self.assertEqual(limit, max(1, (os.cpu_count() or 1) // 2))
+        self.assertEqual(os.environ["OMP_NUM_THREADS"], str(limit))
+        self.assertTrue(isinstance(Concurrency.getExecutor(), ProcessPoolExecutor))
+        self.assertEqual(sum(Concurrency.getExecutor().map(abs, [-1, -2])), 3)
+
+    def testNoConfiguration(self):
+        self.assertEqual(Concurrency.configure(), None)
+        self.assertEqual(os.environ["OMP_NUM_THREADS"], "0")
+        # the limit of a previous configuration is removed
+        Concurrency.configure(num_threads=3)
+        Concurrency.configure(num_processes=2)
+        self.assertEqual(Concurrency.configure(), None)
+        self.assertEqual(os.environ["OMP_NUM_THREADS"], "0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,15 +22,24 @@
 :author: Hubert Degaudenzi
 
 '''
+import os
+import time
 import unittest
 import subprocess
+from unittest import mock
 
-from ElementsKernel.Temporary import TempDir
+from ElementsKernel.Temporary import TempDir, TempEnv
 from ElementsKernel.Path import joinPath, multiPathAppend, getLocationsFromEnv
 from ElementsKernel.Path import getLocations
-from ElementsKernel.Path import which
+from ElementsKernel.Path import which, rehash
 from ElementsKernel.Path import getTargetPath
 from ElementsKernel.Path import removeDuplicates
+from ElementsKernel.Path import getPathFromLocations, getAllPathFromLocations
+from ElementsKernel.Path import enableLocationIndex, disableLocationIndex, getLocationIndex
+from ElementsKernel.Path import getManifest, getAllFilesFromLocation, MANIFEST_FILE_NAME
+from ElementsKernel.Path import enableLocationProbing, disableLocationProbing, getLocationProber
+from ElementsKernel.Path import enableStats, disableStats, getStats
+from ElementsKernel.Path import _getPositiveFloatEnv, PROBE_TIMEOUT_VAR, NEGATIVE_CACHE_TTL_VAR
 
 
 class PathTest(unittest.TestCase):
@@ -80,10 +89,112 @@ class PathTest(unittest.TestCase):
         tmp_list = getLocationsFromEnv("PATH", exist_only=True)
         self.assertNotEqual(len(tmp_list), 0)
 
+    def testLocationProbing(self):
+        slow_location = os.path.join(self._tmpdir_2.path(), "slow")
+        os.mkdir(slow_location)
+        missing_location = os.path.join(self._tmpdir_2.path(), "missing")
+        locations = [slow_location, self._tmpdir_1.path(), missing_location]
+
+        orig_exists = os.path.exists
+
+        def slowExists(path):
+            if path == slow_location:
+                time.sleep(0.5)
+            return orig_exists(path)
+
+        tmpenv = TempEnv()
+        tmpenv["ELEMENTS_AUX_PATH"] = os.pathsep.join(locations)
+
+        enableLocationProbing(timeout=0.1)
+        try:
+            with mock.patch("os.path.exists", slowExists):
+                self.assertEqual(getLocationsFromEnv("ELEMENTS_AUX_PATH", exist_only=True),
+                                 [self._tmpdir_1.path()])
+            self.assertEqual(getLocationProber().getUnavailableLocations(), [slow_location])
+            # the unavailable location is not searched anymore
+            self.assertEqual(getPathFromLocations("slow", [self._tmpdir_2.path()]), slow_location)
+            self.assertEqual(getAllPathFromLocations(".", locations), [os.path.join(self._tmpdir_1.path(), ".")])
+        finally:
+            disableLocationProbing()
+        del tmpenv
+
+    def testNumberVariables(self):
+        tmpenv = TempEnv()
+        for var_name in [PROBE_TIMEOUT_VAR, NEGATIVE_CACHE_TTL_VAR]:
+            tmpenv[var_name] = "0.5"
+            self.assertEqual(_getPositiveFloatEnv(var_name), 0.5)
+            # a malformed value switches the feature off instead of crashing
+            for value in ["", "abc", "0", "-1", "nan"]:
+                tmpenv[var_name] = value
+                with self.assertLogs("ElementsKernel.Path", "WARNING"):
+                    self.assertEqual(_getPositiveFloatEnv(var_name), None)
+            del tmpenv[var_name]
+            self.assertEqual(_getPositiveFloatEnv(var_name), None)
+        del tmpenv
+
+    def testStats(self):
+        locations = [self._tmpdir_1.path(), self._tmpdir_2.path()]
+        with open(os.path.join(self._tmpdir_2.path(), "file1"), "w") as f:
+            f.write("content")
+
+        self.assertEqual(getStats(), None)
+        enableStats()
+        try:
+            self.assertEqual(getPathFromLocations("file1", locations),
+                             os.path.join(self._tmpdir_2.path(), "file1"))
+            stats = getStats()
+            self.assertEqual(stats["getPathFromLocations"]["calls"], 1)
+            self.assertTrue(stats["getPathFromLocations"]["seconds"] >= 0.0)
+            self.assertTrue(stats["stat_calls"] >= 2)
+            self.assertEqual(stats["location_hits"], {self._tmpdir_2.path(): 1})
+        finally:
+            disableStats()
+
     def testWhich(self):
         sys_ls = subprocess.check_output(["which", "ls"]).strip()
         self.assertEqual(sys_ls, which(sys_ls))
 
+    def testWhichHashed(self):
+
+        def createExecutable(name):
+            exe_path = os.path.join(self._tmpdir_1.path(), name)
+            with open(exe_path, "w") as f:
+                f.write("#!/bin/sh\n")
+            os.chmod(exe_path, 0o755)
+            return exe_path
+
+        tmpenv = TempEnv()
+        tmpenv["PATH"] = os.pathsep.join([self._tmpdir_2.path(), self._tmpdir_1.path()])
+
+        exe_1 = createExecutable("exe_1")
+        self.assertEqual(which("exe_1"), exe_1)
+        self.assertEqual(which("exe_2"), None)
+
+        # a new executable is found after the directory changed
+        exe_2 = createExecutable("exe_2")
+        self.assertEqual(which("exe_2"), exe_2)
+
+        # a removed executable is not returned anymore
+        os.remove(exe_1)
+        self.assertEqual(which("exe_1"), None)
+
+        rehash()
+        self.assertEqual(which("exe_2"), exe_2)
+
+        # the empty entry is the current directory
+        old_dir = os.getcwd()
+        try:
+            os.chdir(self._tmpdir_1.path())
+            tmpenv["PATH"] = os.pathsep.join([self._tmpdir_2.path(), ""])
+            self.assertEqual(which("exe_2"), "exe_2")
+            os.chdir(self._tmpdir_2.path())
+            self.assertEqual(which("exe_2"), None)
+            tmpenv["PATH"] = os.pathsep.join(["", self._tmpdir_1.path()])
+            self.assertEqual(which("exe_2"), exe_2)
+        finally:
+            os.chdir(old_dir)
+        del tmpenv
+
     def testGetTargetPath(self):
 
         file_name = "toto"
@@ -117,6 +228,69 @@ class PathTest(unittest.TestCase):
                             "/opt/bin", "/opt/local/bin"]
         self.assertEqual(removeDuplicates(locations), unique_locations)
 
+    def testLocationIndex(self):
+        locations = [self._tmpdir_1.path(), self._tmpdir_2.path()]
+        os.makedirs(os.path.join(self._tmpdir_2.path(), "sub"))
+        with open(os.path.join(self._tmpdir_2.path(), "sub", "file1"), "w") as f:
+            f.write("content")
+
+        enableLocationIndex(check_interval=0.0)
+        try:
+            self.assertEqual(getPathFromLocations("sub/file1", locations),
+                             os.path.join(self._tmpdir_2.path(), "sub", "file1"))
+            self.assertEqual(getPathFromLocations("sub/file2", locations), None)
+
+            # the new file is picked up after the directory changed
+            with open(os.path.join(self._tmpdir_1.path(), "file2"), "w") as f:
+                f.write("content")
+            getLocationIndex().validate()
+            self.assertEqual(getAllPathFromLocations("file2", locations),
+                             [os.path.join(self._tmpdir_1.path(), "file2")])
+        finally:
+            disableLocationIndex()
+
+        self.assertEqual(getLocationIndex(), None)
+
+    def testManifest(self):
+        prefix = self._tmpdir_1.path()
+        aux_location = os.path.join(prefix, "auxdir")
+        conf_location = os.path.join(prefix, "conf")
+        os.makedirs(os.path.join(aux_location, "Mod"))
+        os.makedirs(conf_location)
+        with open(os.path.join(prefix, MANIFEST_FILE_NAME), "w") as f:
+            f.write("auxdir/Mod/file-2.txt\nauxdir/Mod/file.txt\nauxdir/top.txt\n")
+
+        self.assertNotEqual(getManifest(aux_location), None)
+        self.assertEqual(getManifest(conf_location), None)
+
+        # the files are only known from the manifest
+        self.assertEqual(getPathFromLocations("Mod/file.txt", [aux_location]),
+                         os.path.join(aux_location, "Mod", "file.txt"))
+        self.assertEqual(getPathFromLocations("Mod", [aux_location]),
+                         os.path.join(aux_location, "Mod"))
+        self.assertEqual(getPathFromLocations("Mod/file", [aux_location]), None)
+        self.assertEqual(getPathFromLocations("top", [aux_location]), None)
+
+        self.assertEqual(getAllFilesFromLocation(aux_location),
+                         [os.path.join(aux_location, "Mod", "file-2.txt"),
+                          os.path.join(aux_location, "Mod", "file.txt"),
+                          os.path.join(aux_location, "top.txt")])
+
+    def testStaleManifest(self):
+        prefix = self._tmpdir_2.path()
+        aux_location = os.path.join(prefix, "auxdir")
+        os.makedirs(aux_location)
+        with open(os.path.join(prefix, MANIFEST_FILE_NAME), "w") as f:
+            f.write("auxdir/old.txt\n")
+        # a file added after the installation
+        open(os.path.join(aux_location, "new.txt"), "w").close()
+        manifest_time = os.stat(os.path.join(prefix, MANIFEST_FILE_NAME)).st_mtime
+        os.utime(aux_location, (manifest_time + 10, manifest_time + 10))
+
+        self.assertEqual(getManifest(aux_location), None)
+        self.assertEqual(getPathFromLocations("new.txt", [aux_location]),
+                         os.path.join(aux_location, "new.txt"))
+
 
 if __name__ == "__main__":
     unittest.main()
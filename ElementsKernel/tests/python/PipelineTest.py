@@ -0,0 +1,86 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import sys
+import argparse
+import unittest
+
+from ElementsKernel.Temporary import TempDir, TempModule
+from ElementsKernel.Pipeline import PipelineStep, readPipelineFile, runPipeline
+
+
+def _defineStepOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--value", type=int, default=1)
+    return parser
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="pipeline_tempdir")
+        self._modules = [
+            TempModule(name, defineSpecificProgramOptions=_defineStepOptions, mainMethod=main_method)
+            for name, main_method in [
+                ("PipelineTestProduce", lambda args: list(range(args.value))),
+                ("PipelineTestScale", lambda args: [x * args.value for x in args.pipeline_input]),
+                ("PipelineTestFail", lambda args: 3)]]
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        for module in self._modules:
+            module.remove()
+        del self._tmpdir
+
+    def testReadPipelineFile(self):
+        pipeline_file = os.path.join(self._tmpdir.path(), "pipeline.txt")
+        with open(pipeline_file, "w") as f:
+            f.write("# the steps\n")
+            f.write("Module.Produce --value 3\n")
+            f.write('{"module": "Module.Scale", "args": ["--value", 2], "program": "ScaleProgram"}\n')
+        steps = readPipelineFile(pipeline_file)
+        self.assertEqual([(s.module, s.args, s.program) for s in steps],
+                         [("Module.Produce", ["--value", "3"], "Produce"),
+                          ("Module.Scale", ["--value", "2"], "ScaleProgram")])
+
+    def testRunPipeline(self):
+        program_dir = os.path.join(self._tmpdir.path(), "bin")
+        old_argv = sys.argv[:]
+        exit_code, result = runPipeline([PipelineStep("PipelineTestProduce", ["--value", "3"]),
+                                         PipelineStep("PipelineTestScale", ["--value", "10"])],
+                                        program_dir=program_dir)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(result, [0, 10, 20])
+        self.assertEqual(sys.argv, old_argv)
+
+        exit_code, result = runPipeline([PipelineStep("PipelineTestProduce"),
+                                         PipelineStep("PipelineTestFail"),
+                                         PipelineStep("PipelineTestScale")],
+                                        program_dir=program_dir)
+        self.assertEqual((exit_code, result), (3, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import sys
+import json
+import time
+import signal
+import unittest
+
+from ElementsKernel.Temporary import TempDir
+from ElementsKernel.Profiling import ImportTimer, writeReport, runProfiled, SamplingProfiler
+from ElementsKernel.Profiling import getResourceUsage, _getProcIo, MemoryTracer
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="profiling_tempdir")
+        pkg_dir = os.path.join(self._tmpdir.path(), "ProfPkg")
+        os.makedirs(pkg_dir)
+        with open(os.path.join(pkg_dir, "__init__.py"), "w") as f:
+            f.write("from ProfPkg import Sub\n")
+        with open(os.path.join(pkg_dir, "Sub.py"), "w") as f:
+            f.write("VALUE = 1\n")
+        sys.path.insert(0, self._tmpdir.path())
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        sys.path.remove(self._tmpdir.path())
+        for name in ["ProfPkg", "ProfPkg.Sub"]:
+            sys.modules.pop(name, None)
+        del self._tmpdir
+
+    def testImportTimer(self):
+        timer = ImportTimer()
+        timer.start()
+        try:
+            import ProfPkg
+        finally:
+            timer.stop()
+        self.assertTrue(timer not in sys.meta_path)
+        self.assertEqual(ProfPkg.Sub.VALUE, 1)
+        # the modules keep their original loader
+        self.assertFalse(type(ProfPkg.__loader__).__name__ == "_TimedLoader")
+
+        records = dict([(r["module"], r) for r in timer.getRecords()])
+        self.assertTrue("ProfPkg" in records)
+        self.assertTrue("ProfPkg.Sub" in records)
+        self.assertTrue(records["ProfPkg"]["cumulative"] >= records["ProfPkg.Sub"]["cumulative"])
+        self.assertTrue(records["ProfPkg"]["self"] <= records["ProfPkg"]["cumulative"])
+        self.assertEqual(timer.getRecords()[0]["module"], "ProfPkg")
+
+    def testRunProfiled(self):
+        import pstats
+        prof_file = os.path.join(self._tmpdir.path(), "main.prof")
+
+        def mainMethod(value):
+            return value + 1
+
+        self.assertEqual(runProfiled(prof_file, mainMethod, 1), 2)
+        stats = pstats.Stats(prof_file)
+        self.assertTrue([f for f in stats.stats if f[2] == "mainMethod"])
+
+        # the statistics are written even if the function fails
+        os.remove(prof_file)
+
+        def failingMethod():
+            raise ValueError("failure")
+
+        self.assertRaises(ValueError, runProfiled, prof_file, failingMethod)
+        self.assertTrue(os.path.exists(prof_file))
+
+    def testSamplingProfiler(self):
+        folded_file = os.path.join(self._tmpdir.path(), "main.folded")
+
+        def busyMethod():
+            end = time.process_time() + 0.2
+            while time.process_time() < end:
+                pass
+
+        old_handler = signal.getsignal(signal.SIGPROF)
+        profiler = SamplingProfiler(1000, folded_file)
+        profiler.start()
+        try:
+            busyMethod()
+        finally:
+            profiler.stop()
+        self.assertEqual(signal.getsignal(signal.SIGPROF), old_handler)
+        self.assertTrue(profiler.getSampleCount() > 0)
+
+        profiler.write()
+        with open(folded_file) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(int(count) > 0)
+        busy_lines = [l for l in lines if "busyMethod (" in l]
+        self.assertTrue(busy_lines)
+        self.assertTrue(busy_lines[0].startswith("MainThread;"))
+
+        self.assertRaises(ValueError, SamplingProfiler, 0, folded_file)
+
+    def testMemoryTracer(self):
+        import tracemalloc
+        leak = []
+        tracer = MemoryTracer(frames=2, snapshot_signal=signal.SIGUSR2, top=5)
+        tracer.start()
+        try:
+            leak.append(bytearray(2000000))
+            os.kill(os.getpid(), signal.SIGUSR2)
+            leak.append(bytearray(2000000))
+        finally:
+            tracer.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        # signal snapshot and stop snapshot
+        self.assertEqual(len(tracer.getGrowths()), 2)
+
+        report = tracer.getReport()
+        self.assertTrue(report[0].startswith("Peak traced memory"))
+        growth_idx = report.index("Growth since the start:")
+        self.assertTrue(__file__.rstrip("c") in report[growth_idx + 1])
+        self.assertTrue([l for l in report if l.startswith("Growth at ")])
+
+        self.assertRaises(ValueError, MemoryTracer, 0)
+
+    def testResourceUsage(self):
+        usage = getResourceUsage()
+        self.assertEqual(list(usage.keys())[:2], ["self", "children"])
+        self.assertTrue(usage["self"]["max_rss_bytes"] > 0)
+        self.assertTrue(usage["self"]["user_cpu_seconds"] >= 0.0)
+        # it must be serializable for the metrics file
+        json.dumps(usage)
+
+        io_file = os.path.join(self._tmpdir.path(), "io")
+        with open(io_file, "w") as f:
+            f.write("rchar: 10\nwchar: 20\nsyscr: 3\nread_bytes: 4096\nwrite_bytes: 8192\n")
+        self.assertEqual(dict(_getProcIo(io_file)),
+                         {"read_chars": 10, "written_chars": 20,
+                          "read_bytes": 4096, "written_bytes": 8192})
+        self.assertEqual(_getProcIo(os.path.join(self._tmpdir.path(), "missing")), None)
+
+    def testWriteReport(self):
+        report_file = os.path.join(self._tmpdir.path(), "report.json")
+        writeReport({"phases": {"bootstrap": 0.5}, "imports": []}, report_file)
+        with open(report_file) as f:
+            self.assertEqual(json.load(f)["phases"]["bootstrap"], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import io
+import sys
+import time
+import contextlib
+import signal
+import unittest
+
+from ElementsKernel.Temporary import TempDir, TempEnv
+from ElementsKernel.ProgramServer import getSocketPath, runClient, serveProgram
+from ElementsKernel.ProgramServer import isClientEnabled, isServerMode, isPrivateSocketPath
+from ElementsKernel.ProgramServer import _getExitStatus
+
+
+class FakeProgram(object):
+    """ Program writing its request to a file """
+
+    def getProgramName(self):
+        return "FakeProgram"
+
+    def runProgram(self):
+        with open(os.environ["FAKE_PROGRAM_OUTPUT"], "w") as f:
+            f.write("%s %s" % (os.getcwd(), " ".join(sys.argv[1:])))
+        code = sys.argv[1]
+        if code == "exit":
+            raise SystemExit(*sys.argv[2:])
+        return int(code) if code.isdigit() else code
+
+
+class ProgramServerTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="server_tempdir")
+        self._tmpenv = TempEnv()
+        self._tmpenv["XDG_RUNTIME_DIR"] = self._tmpdir.path()
+        self._output = os.path.join(self._tmpdir.path(), "output.txt")
+        self._tmpenv["FAKE_PROGRAM_OUTPUT"] = self._output
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        del self._tmpenv
+        del self._tmpdir
+
+    def _startServer(self, socket_path):
+        """ Fork a server. The exit code is returned if it stops at once """
+        server_pid = os.fork()
+        if server_pid == 0:
+            os._exit(serveProgram(FakeProgram(), socket_path) or 0)
+        for _ in range(100):
+            pid, status = os.waitpid(server_pid, os.WNOHANG)
+            if pid:
+                return server_pid, os.WEXITSTATUS(status)
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        return server_pid, None
+
+    def _stopServer(self, server_pid):
+        os.kill(server_pid, signal.SIGTERM)
+        os.waitpid(server_pid, 0)
+
+    def testModes(self):
+        self.assertFalse(isClientEnabled())
+        self.assertFalse(isServerMode())
+        self._tmpenv["ELEMENTS_PROGRAM_SERVER"] = "serve"
+        self.assertFalse(isClientEnabled())
+        self.assertTrue(isServerMode())
+        self._tmpenv["ELEMENTS_PROGRAM_SERVER"] = "client"
+        self.assertTrue(isClientEnabled())
+        self.assertFalse(isServerMode())
+
+    def testExitStatus(self):
+        for code, status, message in [(None, 0, ""), (0, 0, ""), (3, 3, ""),
+                                      ("2", 1, "2\n"), ("fatal error", 1, "fatal error\n")]:
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(_getExitStatus(code), status)
+            self.assertEqual(stderr.getvalue(), message)
+
+    def testServer(self):
+        socket_path = getSocketPath("FakeProgram")
+        self.assertEqual(socket_path, os.path.join(self._tmpdir.path(), "Elements", "FakeProgram.sock"))
+
+        # no server
+        self.assertEqual(runClient(socket_path, ["FakeProgram", "0"]), None)
+
+        server_pid, _ = self._startServer(socket_path)
+
+        old_handlers = dict([(s, signal.getsignal(s)) for s in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)])
+        try:
+            self.assertTrue(isPrivateSocketPath(socket_path))
+            self.assertEqual(runClient(socket_path, ["FakeProgram", "3", "--option"]), 3)
+            with open(self._output) as f:
+                self.assertEqual(f.read(), "%s 3 --option" % os.getcwd())
+
+            # the exit codes are handled like by the python interpreter
+            self.assertEqual(runClient(socket_path, ["FakeProgram", "exit"]), 0)
+            self.assertEqual(runClient(socket_path, ["FakeProgram", "exit", "fatal error"]), 1)
+            self.assertEqual(runClient(socket_path, ["FakeProgram", "some error"]), 1)
+
+            # the socket is not used if its directory is not private
+            os.chmod(os.path.dirname(socket_path), 0o755)
+            self.assertFalse(isPrivateSocketPath(socket_path))
+            self.assertEqual(runClient(socket_path, ["FakeProgram", "4"]), None)
+            os.chmod(os.path.dirname(socket_path), 0o700)
+        finally:
+            for signum, handler in old_handlers.items():
+                signal.signal(signum, handler)
+            self._stopServer(server_pid)
+
+        self.assertFalse(os.path.exists(socket_path))
+
+    def testServerDirectory(self):
+        socket_path = getSocketPath("FakeProgram")
+        server_dir = os.path.dirname(socket_path)
+        # the server does not reuse a directory accessible by the other users
+        os.mkdir(server_dir, 0o700)
+        os.chmod(server_dir, 0o777)
+        _, exit_code = self._startServer(socket_path)
+        self.assertNotEqual(exit_code, None)
+        self.assertNotEqual(exit_code, 0)
+        self.assertFalse(os.path.exists(socket_path))
+        # the directory is a symbolic link to a private directory
+        os.rmdir(server_dir)
+        target_dir = os.path.join(self._tmpdir.path(), "target")
+        os.mkdir(target_dir, 0o700)
+        os.symlink(target_dir, server_dir)
+        _, exit_code = self._startServer(socket_path)
+        self.assertNotEqual(exit_code, None)
+        self.assertNotEqual(exit_code, 0)
+        self.assertEqual(os.listdir(target_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
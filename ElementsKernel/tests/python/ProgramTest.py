@@ -0,0 +1,472 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import sys
+import json
+import time
+import pstats
+import asyncio
+import argparse
+import unittest
+
+from ElementsKernel.Temporary import TempDir, TempEnv, TempModule
+from ElementsKernel.Program import getConfigFileTokens, LayeredConfiguration, readBatchFile
+from ElementsKernel.Program import LAYERED_CONFIG_VAR
+from ElementsKernel.Program import Program, isCoroutineFunction
+from ElementsKernel import Exit
+from ElementsKernel import Sharding
+from ElementsKernel import Checkpoint
+from ElementsKernel import Concurrency
+
+
+class ProgramTest(unittest.TestCase):
+
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self._tmpdir = TempDir(suffix="program_tempdir")
+        self._tmpenv = TempEnv()
+        self._tmpenv["XDG_CACHE_HOME"] = os.path.join(self._tmpdir.path(), "cache")
+        self._config_file = os.path.join(self._tmpdir.path(), "Prog.conf")
+        with open(self._config_file, "w") as f:
+            f.write("# a comment\n")
+            f.write("int-option = 3 # the value\n")
+            f.write("list-option = a 'b c' \"d e\"\n")
+            f.write("not an option\n")
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        del self._tmpenv
+        del self._tmpdir
+
+    def testConfigFileTokens(self):
+        ref_tokens = [("int-option", ["3"]),
+                      ("list-option", ["a", "'b c'", "\"d e\""])]
+        self.assertEqual(getConfigFileTokens(self._config_file), ref_tokens)
+
+        # the in-process cache follows the changes of the file
+        with open(self._config_file, "a") as f:
+            f.write("other-option = 4\n")
+        self.assertEqual(getConfigFileTokens(self._config_file),
+                         ref_tokens + [("other-option", ["4"])])
+
+    def testConfigFileDiskCache(self):
+        self._tmpenv["ELEMENTS_CONFIG_CACHE"] = "1"
+        tokens = getConfigFileTokens(self._config_file)
+        cache_dir = os.path.join(self._tmpdir.path(), "cache", "Elements", "config")
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertEqual(getConfigFileTokens(self._config_file), tokens)
+
+    def testLayeredConfiguration(self):
+        site_config_file = os.path.join(self._tmpdir.path(), "site", "Prog.conf")
+        os.makedirs(os.path.dirname(site_config_file))
+        with open(site_config_file, "w") as f:
+            f.write("int-option = 1\n")
+            f.write("site-option = yes\n")
+
+        layers = LayeredConfiguration([self._config_file, site_config_file])
+        self.assertEqual(layers.get("int-option"), ["3"])
+        self.assertEqual(layers.get("site-option"), ["yes"])
+        self.assertEqual(layers.get("missing-option"), None)
+        self.assertEqual(layers.getSource("site-option"), site_config_file)
+        self.assertEqual(layers.items(),
+                         [("int-option", ["3"]),
+                          ("list-option", ["a", "'b c'", "\"d e\""]),
+                          ("site-option", ["yes"])])
+
+    def testLayeredConfig(self):
+        values = []
+
+        def addOptions(parser):
+            parser.add_argument("--user-option")
+            parser.add_argument("--site-option")
+
+        module_name = self._createProgramModule(
+            "LayeredProgramTestApp",
+            lambda args: values.append((args.user_option, args.site_option)) or Exit.Code["OK"],
+            addOptions)
+        conf_dirs = [os.path.join(self._tmpdir.path(), d) for d in ("user", "site")]
+        for conf_dir, content in zip(conf_dirs, ["user-option = user\n",
+                                                 "user-option = site\nsite-option = site\n"]):
+            os.makedirs(conf_dir)
+            with open(os.path.join(conf_dir, module_name + ".conf"), "w") as f:
+                f.write(content)
+        self._tmpenv["ELEMENTS_CONF_PATH"] = os.pathsep.join(conf_dirs)
+
+        for argv in [[], ["--layered-config"], ["--layered-config", "--no-layered-config"]]:
+            self.assertEqual(self._runProgram(module_name, argv, use_config_file=True), Exit.Code["OK"])
+        # the environment variable only changes the default
+        self._tmpenv[LAYERED_CONFIG_VAR] = "1"
+        for argv in [[], ["--no-layered-config"]]:
+            self.assertEqual(self._runProgram(module_name, argv, use_config_file=True), Exit.Code["OK"])
+        self.assertEqual(values, [("user", None), ("user", "site"), ("user", None),
+                                  ("user", "site"), ("user", None)])
+
+    def testReadBatchFile(self):
+        batch_file = os.path.join(self._tmpdir.path(), "batch.txt")
+        with open(batch_file, "w") as f:
+            f.write("# a comment\n")
+            f.write("--int-option 1 --list-option a 'b c'\n")
+            f.write("\n")
+            f.write('["--int-option", 2]\n')
+            f.write('{"int-option": 3, "list-option": ["x", "y"], "flag": true, "other": null}\n')
+        self.assertEqual(readBatchFile(batch_file),
+                         [(2, ["--int-option", "1", "--list-option", "a", "b c"]),
+                          (4, ["--int-option", "2"]),
+                          (5, ["--int-option", "3", "--list-option", "x", "y", "--flag"])])
+
+    def _runProgram(self, module_name, argv, **kwargs):
+        """ Run a program module with the command line arguments
+        :param pipeline_input: run the program as a pipeline step with
+            this input
+        :param use_config_file: read the configuration files of the program
+        """
+        old_argv = sys.argv
+        sys.argv = [os.path.join(self._tmpdir.path(), "bin", module_name)] + argv
+        try:
+            self._program = Program(module_name, search_dirs=[self._tmpdir.path()],
+                                    original_path=sys.argv[0],
+                                    use_config_file=kwargs.get("use_config_file", False))
+            if "pipeline_input" in kwargs:
+                self._program.setPipelineInput(kwargs["pipeline_input"])
+            return self._program.runProgram()
+        finally:
+            sys.argv = old_argv
+
+    def _createProgramModule(self, name, main_method, add_options=None):
+        """ Register a program module removed at the end of the test
+        :param main_method: the mainMethod of the program
+        :param add_options: function adding the specific options to the parser
+        :return: the name of the module
+        """
+
+        def defineSpecificProgramOptions():
+            parser = argparse.ArgumentParser()
+            if add_options:
+                add_options(parser)
+            return parser
+
+        module = TempModule(name, defineSpecificProgramOptions=defineSpecificProgramOptions,
+                            mainMethod=main_method)
+        self.addCleanup(module.remove)
+        return name
+
+    def testCoroutineMainMethod(self):
+        state = {}
+
+        async def forever():
+            try:
+                await asyncio.sleep(100)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        async def mainMethod(args):
+            asyncio.get_running_loop().create_task(forever())
+            await asyncio.sleep(0)
+            state["executor_workers"] = args.executor_workers
+            return args.int_option
+
+        self.assertTrue(isCoroutineFunction(mainMethod))
+        self.assertFalse(isCoroutineFunction(self._runProgram))
+
+        module_name = self._createProgramModule(
+            "AsyncProgramTestApp", mainMethod,
+            lambda parser: parser.add_argument("--int-option", type=int, default=0))
+        exit_code = self._runProgram(module_name, ["--int-option", "3", "--executor-workers", "2"])
+        self.assertEqual(exit_code, 3)
+        self.assertEqual(state, {"cancelled": True, "executor_workers": 2})
+
+        # option of the program with the name of a generic one
+        def addOptions(parser):
+            parser.add_argument("--int-option", type=int, default=0)
+            parser.add_argument("--event-loop-policy", default="round-robin")
+
+        state.clear()
+        module_name = self._createProgramModule("AsyncConflictProgramTestApp", mainMethod, addOptions)
+        self.assertEqual(self._runProgram(module_name, ["--int-option", "4"]), 4)
+
+    def _createBatchModule(self):
+        """ Create a program module writing the name option of each run to
+        the output directory. The runs with the fail option fail.
+        """
+        output_dir = os.path.join(self._tmpdir.path(), "output")
+        os.makedirs(output_dir)
+
+        def addOptions(parser):
+            parser.add_argument("--name")
+            parser.add_argument("--fail", action="store_true")
+
+        def mainMethod(args):
+            if args.fail:
+                raise RuntimeError("failure of %s" % args.name)
+            with open(os.path.join(output_dir, args.name), "w") as f:
+                f.write("%d/%d" % Sharding.getShard())
+            return Exit.Code["OK"]
+
+        return self._createProgramModule("BatchProgramTestApp", mainMethod, addOptions), output_dir
+
+    def _writeBatchFile(self, lines):
+        batch_file = os.path.join(self._tmpdir.path(), "batch.txt")
+        with open(batch_file, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return batch_file
+
+    def testBatchFile(self):
+        module_name, output_dir = self._createBatchModule()
+        batch_file = self._writeBatchFile(["--name a", "--name b"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file]), Exit.Code["OK"])
+        self.assertEqual(sorted(os.listdir(output_dir)), ["a", "b"])
+
+        # a failing entry and an entry with wrong arguments
+        self.assertEqual(self._program._runBatchEntry((3, ["--name", "c", "--fail"])), Exit.Code["NOT_OK"])
+        self.assertEqual(self._program._runBatchEntry((4, ["--wrong-option"])), Exit.Code["USAGE"])
+        batch_file = self._writeBatchFile(["--name c", "--name d --fail", "--wrong-option", "--name e"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file]), Exit.Code["NOT_OK"])
+        # the other entries are run anyway
+        self.assertEqual(sorted(os.listdir(output_dir)), ["a", "b", "c", "e"])
+
+    def testBatchWorkers(self):
+        module_name, output_dir = self._createBatchModule()
+        batch_file = self._writeBatchFile(["--name %s" % n for n in "abcde"] + ["--name f --fail"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file, "--batch-workers", "2"]),
+                         Exit.Code["NOT_OK"])
+        self.assertEqual(sorted(os.listdir(output_dir)), ["a", "b", "c", "d", "e"])
+        batch_file = self._writeBatchFile(["--name g", "--name h"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file, "--batch-workers", "2"]),
+                         Exit.Code["OK"])
+        self.assertEqual(sorted(os.listdir(output_dir)), ["a", "b", "c", "d", "e", "g", "h"])
+
+    def testBatchResult(self):
+        module_name = self._createProgramModule(
+            "ResultProgramTestApp", lambda args: {"name": args.name},
+            lambda parser: parser.add_argument("--name"))
+        batch_file = self._writeBatchFile(["--name a", "--name b"])
+        for workers in ["1", "2"]:
+            argv = ["--batch-file", batch_file, "--batch-workers", workers]
+            # the object returned by a pipeline step is its result
+            self.assertEqual(self._runProgram(module_name, argv, pipeline_input=None), Exit.Code["OK"])
+            self.assertEqual(self._program.getResult(), [{"name": "a"}, {"name": "b"}])
+            # out of a pipeline, it is the exit code
+            self.assertEqual(self._runProgram(module_name, argv), Exit.Code["NOT_OK"])
+
+        module_name = self._createProgramModule("ErrorProgramTestApp", lambda args: "some error")
+        self.assertEqual(self._runProgram(module_name, []), "some error")
+        self.assertEqual(self._program.getResult(), None)
+
+    def testBatchShard(self):
+        self.addCleanup(Sharding.configure)
+        module_name, output_dir = self._createBatchModule()
+        batch_file = self._writeBatchFile(["--name a", "--name b --shard-index 0 --shard-count 2",
+                                           "--name c --shard-index 3 --shard-count 2"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file,
+                                                        "--shard-index", "1", "--shard-count", "3"]),
+                         Exit.Code["NOT_OK"])
+        shards = {}
+        for name in os.listdir(output_dir):
+            with open(os.path.join(output_dir, name)) as f:
+                shards[name] = f.read()
+        self.assertEqual(shards, {"a": "1/3", "b": "0/2"})
+        # the shard of the program is restored
+        self.assertEqual(Sharding.getShard(), (1, 3))
+        # a zero shard count is a usage error, not a single shard
+        with self.assertRaises(SystemExit):
+            self._runProgram(module_name, ["--shard-count", "0"])
+
+    def testBatchCheckpoint(self):
+        processed = []
+
+        def mainMethod(args):
+            checkpoint = Checkpoint.getCheckpoint()
+            for idx, item in checkpoint.iterate(range(3)):
+                processed.append((args.name, item))
+                checkpoint.save(idx + 1)
+            return Exit.Code["OK"]
+
+        module_name = self._createProgramModule("CheckpointProgramTestApp", mainMethod,
+                                                lambda parser: parser.add_argument("--name"))
+
+        checkpoint_dir = os.path.join(self._tmpdir.path(), "checkpoints")
+        batch_file = self._writeBatchFile(["--name a", "--name b"])
+        argv = ["--batch-file", batch_file, "--checkpoint-dir", checkpoint_dir]
+        self.assertEqual(self._runProgram(module_name, argv), Exit.Code["OK"])
+        # each entry has its own checkpoint
+        self.assertEqual(processed, [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1), ("b", 2)])
+        self.assertEqual(sorted(os.listdir(checkpoint_dir)),
+                         ["%s.line%d.checkpoint" % (module_name, i) for i in (1, 2)])
+        self.assertEqual(Checkpoint.getCheckpoint(), None)
+
+        # the completed entries are not run again, the changed entry is restarted
+        del processed[:]
+        batch_file = self._writeBatchFile(["--name a", "--name c"])
+        argv = ["--batch-file", batch_file, "--checkpoint-dir", checkpoint_dir, "--resume"]
+        self.assertEqual(self._runProgram(module_name, argv), Exit.Code["OK"])
+        self.assertEqual(processed, [("c", 0), ("c", 1), ("c", 2)])
+
+    def testPipelineInput(self):
+        inputs = []
+
+        def mainMethod(args):
+            inputs.append(args.pipeline_input)
+            return Exit.Code["OK"]
+
+        module_name = self._createProgramModule(
+            "PipelineInputTestApp", mainMethod,
+            lambda parser: parser.add_argument("--pipeline-input", default="user-value"))
+
+        # the option of the program is kept out of a pipeline
+        self.assertEqual(self._runProgram(module_name, []), Exit.Code["OK"])
+        self.assertEqual(inputs, ["user-value"])
+
+        # the batch entries get the input of the pipeline as well
+        batch_file = self._writeBatchFile(["--log-level INFO"])
+        self.assertEqual(self._runProgram(module_name, ["--batch-file", batch_file], pipeline_input=[1, 2]),
+                         Exit.Code["OK"])
+        self.assertEqual(inputs, ["user-value", [1, 2]])
+
+    def testProfileStartup(self):
+        inputs = []
+        module_name = self._createProgramModule(
+            "StartupProgramTestApp", lambda args: inputs.append(args.input_file) or Exit.Code["OK"],
+            lambda parser: parser.add_argument("input_file"))
+        input_file = os.path.join(self._tmpdir.path(), "input.dat")
+        with open(input_file, "w") as f:
+            f.write("data")
+        # the flag does not take the next argument
+        self.assertEqual(self._runProgram(module_name, ["--profile-startup", input_file]), Exit.Code["OK"])
+        self.assertEqual(inputs, [input_file])
+        with open(input_file) as f:
+            self.assertEqual(f.read(), "data")
+
+        report_file = os.path.join(self._tmpdir.path(), "startup.json")
+        self.assertEqual(self._runProgram(module_name, [input_file, "--profile-startup-output", report_file]),
+                         Exit.Code["OK"])
+        with open(report_file) as f:
+            report = json.load(f)
+        self.assertTrue("parse" in report["phases"])
+        self.assertEqual(report["imports"], [])
+
+    def testTraceMemory(self):
+        inputs = []
+        module_name = self._createProgramModule(
+            "MemoryProgramTestApp", lambda args: inputs.append(args.input_file) or Exit.Code["OK"],
+            lambda parser: parser.add_argument("input_file"))
+        # the flag does not take the next argument
+        with self.assertLogs("ElementsProgram", level="INFO") as logs:
+            self.assertEqual(self._runProgram(module_name, ["--trace-memory", "cat.txt"]), Exit.Code["OK"])
+        self.assertEqual(inputs, ["cat.txt"])
+        self.assertTrue([l for l in logs.output if "Memory Allocations" in l])
+
+        with self.assertLogs("ElementsProgram", level="INFO") as logs:
+            self.assertEqual(self._runProgram(module_name, ["cat.txt", "--trace-memory-frames", "3"]),
+                             Exit.Code["OK"])
+        self.assertTrue([l for l in logs.output if "Memory Allocations" in l])
+
+    def testProfile(self):
+
+        def profiledMainMethod(args):
+            return Exit.Code["OK"]
+
+        module_name = self._createProgramModule("ProfileProgramTestApp", profiledMainMethod)
+        profile_file = os.path.join(self._tmpdir.path(), "main.prof")
+        self.assertEqual(self._runProgram(module_name, ["--profile-output", profile_file]), Exit.Code["OK"])
+        functions = [f[2] for f in pstats.Stats(profile_file).stats]
+        self.assertTrue("profiledMainMethod" in functions)
+
+        # the default output file is in the current directory
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self._tmpdir.path())
+        self.assertEqual(self._runProgram(module_name, ["--profile"]), Exit.Code["OK"])
+        self.assertTrue(os.path.exists("%s.%d.prof" % (module_name, os.getpid())))
+
+    def testSampleProfile(self):
+
+        def sampledMainMethod(args):
+            end = time.process_time() + 0.3
+            while time.process_time() < end:
+                pass
+            return Exit.Code["OK"]
+
+        module_name = self._createProgramModule("SampleProgramTestApp", sampledMainMethod)
+        stacks_file = os.path.join(self._tmpdir.path(), "main.folded")
+        self.assertEqual(self._runProgram(module_name, ["--sample-profile", "200",
+                                                        "--sample-profile-output", stacks_file]),
+                         Exit.Code["OK"])
+        with open(stacks_file) as f:
+            lines = f.read().splitlines()
+        self.assertTrue([l for l in lines if "sampledMainMethod" in l])
+        # the collapsed stack format: the stack and the number of samples
+        self.assertTrue(all([l.rsplit(" ", 1)[1].isdigit() for l in lines]))
+
+    def testMetricsFile(self):
+        module_name = self._createProgramModule("MetricsProgramTestApp", lambda args: 3)
+        metrics_file = os.path.join(self._tmpdir.path(), "metrics.json")
+        self.assertEqual(self._runProgram(module_name, ["--metrics-file", metrics_file]), 3)
+        with open(metrics_file) as f:
+            metrics = json.load(f)
+        self.assertEqual(metrics["program"], module_name)
+        self.assertEqual(metrics["exit_code"], 3)
+        self.assertTrue("main" in metrics["phases"])
+        self.assertTrue("max_rss_bytes" in metrics["resources"]["self"])
+
+    def testConflictingOptions(self):
+        # options of the program with the names of generic options
+        values = {}
+
+        def addOptions(parser):
+            parser.add_argument("--num-threads", default="all")
+            parser.add_argument("--profile", default="default")
+            parser.add_argument("--batch-file", type=int)
+            parser.add_argument("--shard-count", type=int)
+            parser.add_argument("--checkpoint-dir")
+            parser.add_argument("--metrics-file", action="store_true")
+            parser.add_argument("--sample-profile")
+
+        def mainMethod(args):
+            values.update(vars(args))
+            return Exit.Code["OK"]
+
+        for var in Concurrency.THREAD_LIMIT_VARS:
+            self._tmpenv[var] = "0"
+        module_name = self._createProgramModule("ConflictProgramTestApp", mainMethod, addOptions)
+        argv = ["--num-threads", "2", "--profile", "fast", "--batch-file", "4", "--shard-count", "0",
+                "--checkpoint-dir", "db", "--metrics-file",
+                "--sample-profile", "all"]
+        self.assertEqual(self._runProgram(module_name, argv), Exit.Code["OK"])
+        self.assertEqual(values["num_threads"], "2")
+        self.assertEqual(values["profile"], "fast")
+        self.assertEqual(values["batch_file"], 4)
+        self.assertEqual(values["shard_count"], 0)
+        self.assertEqual(values["checkpoint_dir"], "db")
+        self.assertEqual(values["metrics_file"], True)
+        self.assertEqual(values["sample_profile"], "all")
+        # the generic features are not enabled by the options of the program
+        self.assertEqual(Concurrency.getNumThreads(), None)
+        self.assertEqual(Sharding.getShard(), (0, 1))
+        self.assertEqual(Checkpoint.getCheckpoint(), None)
+        self.assertEqual(os.environ["OMP_NUM_THREADS"], "0")
+        self.assertFalse(os.path.exists("%s.%d.prof" % (module_name, os.getpid())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#
+# Copyright (C) 2012-2020 Euclid Science Ground Segment
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3.0 of the License, or (at your option)
+# any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+
+'''
+:date: Oct 18, 2026
+
+'''
+
+import os
+import unittest
+
+from ElementsKernel.Temporary import TempDir
+from ElementsKernel import Sharding
+
+
+class ShardingTest(unittest.TestCase):
+
+    def tearDown(self):
+        unittest.TestCase.tearDown(self)
+        Sharding.configure()
+
+    def testPartition(self):
+        items = ["item%d" % i for i in range(10)]
+        shards = [Sharding.partition(items, i, 4) for i in range(4)]
+        # all the items once, in order, with balanced sizes
+        self.assertEqual(sum(shards, []), items)
+        self.assertEqual([len(s) for s in shards], [2, 3, 2, 3])
+        # more shards than items
+        self.assertEqual([len(Sharding.partition(items[:2], i, 4)) for i in range(4)], [0, 1, 0, 1])
+
+    def testPartitionRange(self):
+        self.assertEqual(list(Sharding.partitionRange(10, shard_index=1, shard_count=3)), [3, 4, 5])
+        self.assertEqual(list(Sharding.partitionRange(5, 15, shard_index=2, shard_count=3)), [11, 12, 13, 14])
+        self.assertEqual(list(Sharding.partitionRange(5, 2, shard_index=0, shard_count=2)), [])
+
+    def testPartitionGlob(self):
+        tmpdir = TempDir(suffix="sharding_tempdir")
+        for name in ["c.fits", "a.fits", "b.fits", "b.txt"]:
+            open(os.path.join(tmpdir.path(), name), "w").close()
+        pattern = os.path.join(tmpdir.path(), "*.fits")
+        self.assertEqual(Sharding.partitionGlob(pattern, 0, 2), [os.path.join(tmpdir.path(), "a.fits")])
+        self.assertEqual(Sharding.partitionGlob(pattern, 1, 2),
+                         [os.path.join(tmpdir.path(), "b.fits"), os.path.join(tmpdir.path(), "c.fits")])
+
+    def testProgramShard(self):
+        self.assertEqual(Sharding.getShard(), (0, 1))
+        self.assertEqual(Sharding.getShardFileName("run.log"), "run.log")
+        Sharding.configure(2, 5)
+        self.assertEqual(Sharding.getShard(), (2, 5))
+        self.assertEqual(Sharding.partition(range(10)), [4, 5])
+        self.assertEqual(Sharding.getShardFileName("/tmp/run.log"), "/tmp/run.shard2.log")
+        self.assertRaises(ValueError, Sharding.configure, 5, 5)
+        self.assertRaises(ValueError, Sharding.configure, 0, -1)
+        # a zero count is not the default count
+        self.assertRaises(ValueError, Sharding.configure, 0, 0)
+        self.assertRaises(ValueError, Sharding.configure, -1, 2)
+        self.assertRaises(ValueError, Sharding.configure, 1, None)
+        self.assertRaises(ValueError, Sharding.partition, range(10), 0, 0)
+        self.assertRaises(ValueError, Sharding.partition, range(10), 2, 2)
+        self.assertEqual(Sharding.getShard(), (2, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,8 @@ import os
 from shutil import rmtree
 
 from ElementsKernel.Temporary import TempDir, TempFile
-from ElementsKernel.Temporary import TempEnv
+from ElementsKernel.Temporary import TempEnv, TempModule
+import sys
 
 import unittest
 
@@ -140,6 +141,14 @@ class TestCase(unittest.TestCase):
 
         self.assertEqual(self.m_env["WORKSPACE"], os.path.join(self.m_top_dir.path(), "work"))
 
+    def testTempModule(self):
+
+        with TempModule("TempTestModule", value=3) as module:
+            import TempTestModule  # pylint: disable=import-error
+            self.assertEqual(TempTestModule.value, 3)
+            self.assertEqual(module.getName(), "TempTestModule")
+        self.assertFalse("TempTestModule" in sys.modules)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -208,6 +208,10 @@ option(USE_LOCAL_INSTALLAREA
        "Use local InstallArea for the Developers"
        OFF)
 
+option(ELEMENTS_FAST_START_LAUNCHERS
+       "Install the python programs with fast-start launchers (resolved python path and precompiled bytecode)"
+       OFF)
+
 option(OPT_DEBUG
        "Enable optimisation for the Debug version"
        ON)
@@ -50,6 +50,12 @@ if(POLICY CMP0054)
   endif()
 endif()
 
+if(POLICY CMP0082)
+  # this policy is related to the ordering of the install rules of the subdirectories
+  # please run "cmake --help-policy CMP0082" for more details
+  cmake_policy(SET CMP0082 NEW)
+endif()
+
 
 if (NOT HAS_ELEMENTS_TOOLCHAIN)
   # this is the call to the preload_local_module_path is the toolchain has not been called
@@ -316,6 +322,11 @@ macro(elements_project project version)
     set(instmodule_cmd ${PYTHON_EXECUTABLE} ${instmodule_cmd})
   endif()
 
+  find_program(manifest_cmd createProjManifest.py HINTS ${binary_paths})
+  if(manifest_cmd)
+    set(manifest_cmd ${PYTHON_EXECUTABLE} ${manifest_cmd})
+  endif()
+
 
   find_program(thisheader_cmd createThisProjHeader.py HINTS ${binary_paths})
   if(thisheader_cmd)
@@ -962,6 +973,10 @@ elements_generate_env_conf\(${installed_env_xml} ${installed_project_build_envir
   if(NOT SQUEEZED_INSTALL)
     set(CPACK_RPM_REGULAR_FILES "${CPACK_RPM_REGULAR_FILES}
 %{_prefix}/manifest.xml")
+    if(manifest_cmd AND (POLICY CMP0082))
+      set(CPACK_RPM_REGULAR_FILES "${CPACK_RPM_REGULAR_FILES}
+%{_prefix}/ELEMENTS_MANIFEST")
+    endif()
   endif()
 
 
@@ -1445,6 +1460,25 @@ ${MAIN_PROJECT_CHANGELOG}
 
   endif()
 
+  # The installed python modules of the fast-start launchers are precompiled
+  # once, when all of them are installed: the installation locations are often
+  # read-only for the users of the programs. As for the manifest, this is only
+  # guaranteed with the CMP0082 policy.
+  if(ELEMENTS_FAST_START_LAUNCHERS AND (POLICY CMP0082))
+    install(CODE "message\(STATUS \"Precompiling: python modules in \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}/${PYTHON_INSTALL_SUFFIX}\"\)
+execute_process\(COMMAND ${PYTHON_EXECUTABLE} -m compileall -q -d \${CMAKE_INSTALL_PREFIX}/${PYTHON_INSTALL_SUFFIX} \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}/${PYTHON_INSTALL_SUFFIX}\)")
+  endif()
+
+  # The lookup manifest has to be generated once all the files are installed.
+  # This is only guaranteed with the CMP0082 policy. The manifest is only relevant
+  # for a project that has its own installation prefix. It is recorded in the
+  # install_manifest.txt file to be removed by the uninstall target.
+  if(manifest_cmd AND (POLICY CMP0082) AND NOT SQUEEZED_INSTALL)
+    install(CODE "message\(STATUS \"Installing: ELEMENTS_MANIFEST in \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}\"\)
+execute_process\(COMMAND ${manifest_cmd} --quiet -s ${BIN_INSTALL_SUFFIX} -s ${SCRIPT_INSTALL_SUFFIX} -s ${LIB_INSTALL_SUFFIX} -s ${PYTHON_INSTALL_SUFFIX} -s ${CONF_INSTALL_SUFFIX} -s ${AUX_INSTALL_SUFFIX} \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}\)
+list\(APPEND CMAKE_INSTALL_MANIFEST_FILES \"\${CMAKE_INSTALL_PREFIX}/ELEMENTS_MANIFEST\"\)")
+  endif()
+
   include(ElementsDocumentation)
   include(ElementsCoverage)
   include(ElementsUninstall)
@@ -4688,7 +4722,18 @@ function(elements_add_python_program executable module)
   add_custom_target(${python_program_target} ALL DEPENDS ${executable_file})
   set_property(DIRECTORY APPEND PROPERTY ADDITIONAL_MAKE_CLEAN_FILES ${executable_file})
 
-  install(PROGRAMS ${executable_file} DESTINATION ${SCRIPT_INSTALL_SUFFIX})
+  if(ELEMENTS_FAST_START_LAUNCHERS)
+    # The fast-start launcher is generated at installation time, once the
+    # project installation python module is available
+    set(fast_start_options)
+    if(PYPROG_NO_CONFIG_FILE)
+      set(fast_start_options --no-config-file)
+    endif()
+    install(CODE "message\(STATUS \"Installing: ${executable} fast-start launcher in \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}/${SCRIPT_INSTALL_SUFFIX}\"\)
+execute_process\(COMMAND ${pythonprogramscript_cmd} --python-explicit-version=${PYTHON_SCRIPT_VERSION} --module ${module} --outdir \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}/${SCRIPT_INSTALL_SUFFIX} --execname ${executable} --project-name ${CMAKE_PROJECT_NAME} --elements-module-name ${elements_module_name} --elements-module-version ${elements_module_version} --elements-default-loglevel=${ELEMENTS_DEFAULT_LOGLEVEL} ${fast_start_options} --fast-start --install-python-dir \$ENV{DESTDIR}\${CMAKE_INSTALL_PREFIX}/${PYTHON_INSTALL_SUFFIX}\)")
+  else()
+    install(PROGRAMS ${executable_file} DESTINATION ${SCRIPT_INSTALL_SUFFIX})
+  endif()
 
   set_property(GLOBAL APPEND PROPERTY REGULAR_SCRIPT_OBJECTS ${executable})
   set_property(GLOBAL APPEND PROPERTY PROJ_HAS_SCRIPTS TRUE)
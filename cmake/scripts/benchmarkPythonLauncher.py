@@ -0,0 +1,140 @@
+""" Script module to compare the start time of the regular and of the
+fast-start python program launchers.
+
+A dummy project is installed in a temporary directory with a program
+launched by both flavors. The "cold" start is the first start after the
+installation in a read-only location: no bytecode has been cached for the
+project modules except the one shipped by the fast-start installation. The
+"warm" start is a start with the bytecode of all the modules cached.
+
+ElementsKernel has to be in the PYTHONPATH.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from optparse import OptionParser
+
+PROJECT_NAME = "BenchProject"
+
+PROGRAM_MODULE = "BenchProgram"
+
+PROGRAM_CODE = """\
+import argparse
+
+def defineSpecificProgramOptions():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--value', type=int, default=1)
+    return parser
+
+def mainMethod(args):
+    return 0
+"""
+
+
+def createProject(prefix, modules):
+    """ Install the dummy project and its launchers in the prefix
+    :param modules: number of additional python modules imported by the
+        program
+    """
+    proj = PROJECT_NAME.upper()
+    python_dir = os.path.join(prefix, "python")
+    os.makedirs(python_dir)
+    os.makedirs(os.path.join(prefix, "bin"))
+    with open(os.path.join(python_dir, proj + "_VERSION.py"), "w") as f:
+        f.write('%s_VERSION_STRING = "1.0"\n%s_VCS_VERSION = "1.0"\n' % (proj, proj))
+    with open(os.path.join(python_dir, proj + "_INSTALL.py"), "w") as f:
+        f.write('%s_INSTALL_LOCATION = "%s"\n' % (proj, prefix))
+        f.write('%s_SEARCH_DIRS = [%s_INSTALL_LOCATION]\n' % (proj, proj))
+    with open(os.path.join(python_dir, PROGRAM_MODULE + ".py"), "w") as f:
+        for i in range(modules):
+            f.write("import BenchModule%d\n" % i)
+        f.write(PROGRAM_CODE)
+    for i in range(modules):
+        with open(os.path.join(python_dir, "BenchModule%d.py" % i), "w") as f:
+            f.write("".join(["def function%d(x):\n    return x + %d\n\n" % (j, j) for j in range(200)]))
+
+    generator = os.path.join(os.path.dirname(os.path.abspath(__file__)), "createPythonProgramScript.py")
+    common_args = [sys.executable, generator, "--module", PROGRAM_MODULE,
+                   "--outdir", os.path.join(prefix, "bin"),
+                   "--project-name", PROJECT_NAME,
+                   "--elements-module-name", "BenchModule",
+                   "--elements-module-version", "1.0",
+                   "--elements-default-loglevel", "DEBUG",
+                   "--no-config-file"]
+    subprocess.check_call(common_args + ["--execname", "RegularLauncher"])
+    # The fast-start installation ships the bytecode of the project
+    subprocess.check_call(common_args + ["--execname", "FastLauncher", "--fast-start",
+                                         "--install-python-dir", python_dir])
+    return python_dir
+
+
+def removeBytecode(python_dir):
+    """ Remove the cached bytecode of the project modules """
+    shutil.rmtree(os.path.join(python_dir, "__pycache__"), ignore_errors=True)
+
+
+def timeRun(launcher, env):
+    """ Get the wall time of a run of the launcher """
+    start = time.time()
+    subprocess.check_call([sys.executable, launcher], env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.time() - start
+
+
+def formatTimes(times):
+    """ Get the min and median of the times in ms """
+    times = sorted(times)
+    return "%8.1f %8.1f" % (times[0] * 1000.0, times[len(times) // 2] * 1000.0)
+
+
+def main():
+    """ main function of the script module """
+    parser = OptionParser(usage="Usage %prog [-r runs] [-m modules]")
+    parser.add_option("-r", "--runs", type="int", default=10,
+                      help="number of runs per measurement (default: 10)")
+    parser.add_option("-m", "--modules", type="int", default=20,
+                      help="number of python modules imported by the program (default: 20)")
+    opts, _ = parser.parse_args()
+
+    prefix = tempfile.mkdtemp(prefix="launcher_bench_")
+    try:
+        python_dir = createProject(prefix, opts.modules)
+        shipped_bytecode = os.path.join(prefix, "shipped_pycache")
+        shutil.copytree(os.path.join(python_dir, "__pycache__"), shipped_bytecode)
+
+        env = dict(os.environ)
+        cold_env = dict(env)
+        # read-only installation: the bytecode cannot be cached
+        cold_env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+        flavors = ("RegularLauncher", "FastLauncher")
+        launchers = dict([(f, os.path.join(prefix, "bin", f)) for f in flavors])
+        cold_times = dict([(f, []) for f in flavors])
+        warm_times = dict([(f, []) for f in flavors])
+        # the runs of the flavors are interleaved to share the load drifts
+        # of the machine
+        for _ in range(opts.runs):
+            for flavor in flavors:
+                removeBytecode(python_dir)
+                if flavor == "FastLauncher":
+                    shutil.copytree(shipped_bytecode, os.path.join(python_dir, "__pycache__"))
+                cold_times[flavor].append(timeRun(launchers[flavor], cold_env))
+        # cache the bytecode of all the modules
+        timeRun(launchers["RegularLauncher"], env)
+        for _ in range(opts.runs):
+            for flavor in flavors:
+                warm_times[flavor].append(timeRun(launchers[flavor], env))
+
+        print("%-16s %17s %17s" % ("", "cold [ms]", "warm [ms]"))
+        print("%-16s %8s %8s %8s %8s" % ("launcher", "min", "median", "min", "median"))
+        for flavor in flavors:
+            print("%-16s %s %s" % (flavor, formatTimes(cold_times[flavor]), formatTimes(warm_times[flavor])))
+    finally:
+        shutil.rmtree(prefix)
+
+
+if __name__ == "__main__":
+    main()
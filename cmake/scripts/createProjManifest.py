@@ -0,0 +1,68 @@
+""" Script module to generate the project installation manifest """
+import os
+from optparse import OptionParser
+
+MANIFEST_FILE_NAME = "ELEMENTS_MANIFEST"
+
+DEFAULT_SUBDIRS = ["bin", "scripts", "lib", "lib64", "python", "conf", "auxdir"]
+
+
+def getManifestEntries(location, subdirs):
+    """ Collect the sorted list of the files installed under the subdirs
+    of the location. The entries are relative to the location and use "/"
+    as separator. They are sorted bytewise to allow a binary search.
+    """
+    entries = []
+    for s in subdirs:
+        top_dir = os.path.join(location, s)
+        if not os.path.isdir(top_dir):
+            continue
+        for root, _, files in os.walk(top_dir):
+            rel_root = os.path.relpath(root, location).replace(os.sep, "/")
+            for f in files:
+                entries.append((rel_root + "/" + f).encode("utf-8"))
+
+    return sorted(entries)
+
+
+def main():
+    """ main function of the script module """
+    parser = OptionParser(
+        usage="ERROR: Usage %prog [-s subdir]... <location>")
+
+    parser.add_option("-q", "--quiet", action="store_true",
+                      help="Do not print messages")
+
+    parser.set_defaults(subdirs=[])
+    parser.add_option("-s", "--subdir", action="append", dest="subdirs",
+                      help="installation sub-directory to be listed (can be repeated)")
+
+    opts, args = parser.parse_args()
+
+    if len(args) != 1:
+        parser.error("wrong number of arguments: %s" % ",".join(args))
+
+    location = args[0]
+    subdirs = opts.subdirs or DEFAULT_SUBDIRS
+    outputfile = os.path.join(location, MANIFEST_FILE_NAME)
+
+    if not opts.quiet:
+        print("Creating %s for the %s install location" % (outputfile, location))
+
+    outputdata = b"".join([e + b"\n" for e in getManifestEntries(location, subdirs)])
+
+    # Get the current content of the destination file (if any)
+    try:
+        with open(outputfile, "rb") as f:
+            olddata = f.read()
+    except IOError:
+        olddata = None
+
+    # Overwrite the file only if there are changes
+    if outputdata != olddata:
+        with open(outputfile, "wb") as f:
+            f.write(outputdata)
+
+
+if __name__ == "__main__":
+    main()
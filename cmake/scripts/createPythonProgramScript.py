@@ -1,6 +1,8 @@
 import argparse
+import importlib
 import os
 import stat
+import sys
 
 parser = argparse.ArgumentParser()
 
@@ -33,6 +35,12 @@ parser.add_argument('--elements-default-loglevel', default="DEBUG",
 parser.add_argument('--no-config-file', default=False, action="store_true",
                     help='default log level for the Elements framework')
 
+parser.add_argument('--fast-start', default=False, action="store_true",
+                    help='generate a fast-start launcher for an installed program')
+
+parser.add_argument('--install-python-dir',
+                    help='the installed python directory of the project (for --fast-start)')
+
 
 args = parser.parse_args()
 
@@ -96,6 +104,22 @@ sys.path = old_path
 # insert python path list after the env variable in sys.path
 _updateSysPath(update_list + [os.path.join(p, "python") for p in %(proj)s_SEARCH_DIRS[1:]])
 
+# send the request to the warm server of the program if it is running. The
+# server module is only imported when the server is used.
+ProgramServer = None
+if os.environ.get("ELEMENTS_PROGRAM_SERVER", ""):
+    from ElementsKernel import ProgramServer
+    server_socket = ProgramServer.getSocketPath(os.path.basename(__file__))
+    if ProgramServer.isClientEnabled():
+        server_exit_code = ProgramServer.runClient(server_socket)
+        if server_exit_code is not None:
+            exit(server_exit_code)
+
+# record the import time of the modules for the --profile-startup options
+if [a for a in sys.argv[1:] if a.startswith("--profile-startup")]:
+    from ElementsKernel.Profiling import startImportTimer
+    startImportTimer()
+
 from ElementsKernel.Program import Program
 
 p = Program('%(MODULE_NAME)s',
@@ -106,6 +130,9 @@ p = Program('%(MODULE_NAME)s',
              logging.%(LogLevel)s,
              use_config_file=%(UseConfigFile)s)
 
+if ProgramServer and ProgramServer.isServerMode():
+    exit(ProgramServer.serveProgram(p, server_socket))
+
 exit(p.runProgram())
 """ % {'MODULE_NAME' : args.module,
        'proj' : args.project_name.upper(),
@@ -117,6 +144,95 @@ exit(p.runProgram())
        'UseConfigFile': use_config_file_string
       }
 
+fast_template = """\
+#!/usr/bin/env python%(Python_version)s
+# Automatically generated file at installation: do not modify!
+# Fast-start launcher: the python path, the search directories and the
+# versions of the project have been resolved at installation time.
+
+import sys, os
+import logging
+
+# insert the python path list after the env variable in sys.path
+insert_idx = 1
+env_path = os.environ.get("PYTHONPATH", None)
+if env_path and not sys.flags.ignore_environment:
+    insert_idx += len(env_path.split(os.pathsep))
+sys.path[insert_idx:insert_idx] = %(python_path)r
+
+# send the request to the warm server of the program if it is running. The
+# server module is only imported when the server is used.
+ProgramServer = None
+if os.environ.get("ELEMENTS_PROGRAM_SERVER", ""):
+    from ElementsKernel import ProgramServer
+    server_socket = ProgramServer.getSocketPath(os.path.basename(__file__))
+    if ProgramServer.isClientEnabled():
+        server_exit_code = ProgramServer.runClient(server_socket)
+        if server_exit_code is not None:
+            exit(server_exit_code)
+
+# record the import time of the modules for the --profile-startup options
+if [a for a in sys.argv[1:] if a.startswith("--profile-startup")]:
+    from ElementsKernel.Profiling import startImportTimer
+    startImportTimer()
+
+from ElementsKernel.Program import Program
+
+p = Program('%(MODULE_NAME)s',
+             %(version_string)r, %(Proj)r,
+             %(vcs_version)r,
+             %(Mod_name)r, %(Mod_version)r,
+             %(search_dirs)r, os.path.realpath(__file__),
+             logging.%(LogLevel)s,
+             use_config_file=%(UseConfigFile)s)
+
+if ProgramServer and ProgramServer.isServerMode():
+    exit(ProgramServer.serveProgram(p, server_socket))
+
+exit(p.runProgram())
+"""
+
+
+def resolveInstallation(project, python_dir):
+    """ Get the version strings and the search directories of the installed
+    project. The installation modules of the used projects have to be in
+    the python path.
+    """
+    proj = project.upper()
+    sys.path.insert(0, python_dir)
+    try:
+        version_module = importlib.import_module(proj + "_VERSION")
+        install_module = importlib.import_module(proj + "_INSTALL")
+        return (getattr(version_module, proj + "_VERSION_STRING"),
+                getattr(version_module, proj + "_VCS_VERSION"),
+                list(getattr(install_module, proj + "_SEARCH_DIRS")))
+    except (ImportError, AttributeError) as e:
+        print('Cannot resolve the installation of %s: %s' % (project, e))
+        return None
+    finally:
+        sys.path.remove(python_dir)
+
+
+if args.fast_start:
+    if not args.install_python_dir:
+        parser.error('--fast-start requires --install-python-dir')
+    resolved = resolveInstallation(args.project_name, args.install_python_dir)
+    if resolved:
+        version_string, vcs_version, search_dirs = resolved
+        template = fast_template % {'MODULE_NAME': args.module,
+                                    'Proj': args.project_name,
+                                    'version_string': version_string,
+                                    'vcs_version': vcs_version,
+                                    'Mod_name': args.elements_module_name,
+                                    'Mod_version': args.elements_module_version,
+                                    'Python_version': args.python_explicit_version,
+                                    'LogLevel': args.elements_default_loglevel,
+                                    'UseConfigFile': use_config_file_string,
+                                    'search_dirs': search_dirs,
+                                    'python_path': [os.path.join(d, "python") for d in search_dirs]}
+    else:
+        print('Falling back to the regular launcher for %s' % args.execname)
+
 filename = os.path.join(args.outdir, args.execname)
 
 with open(filename, 'w') as f: